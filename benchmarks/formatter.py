@@ -0,0 +1,79 @@
+"""
+Microbenchmark for formatting an execution log record, comparing the naive json.dumps(default=str) formatter
+most deployments write with the bundled ExecutionLogFormatter, with and without orjson.
+
+Usage:
+
+    python -m benchmarks.formatter [--items 50] [--repeat 5] [--number 2000]
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import timeit
+
+import django
+from django.conf import settings
+
+SECTIONS = ("request", "response", "execution", "info")
+
+
+class NaiveFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {"timestamp": record.created, "level": record.levelname, "message": record.getMessage()}
+        data.update({name: record.__dict__[name] for name in SECTIONS if name in record.__dict__})
+        return json.dumps(data, default=str)
+
+
+def execution_log_record(items: int) -> logging.LogRecord:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    record = logging.LogRecord("restlogger", logging.INFO, __file__, 1, "Execution Log", None, None)
+    record.__dict__.update(
+        {
+            "request": {
+                "url": "/api/items/?page=1",
+                "method": "GET",
+                "headers": {"Content-Type": "application/json", "Accept": "*/*", "User-Agent": "benchmark"},
+                "body": {},
+                "user": "john",
+                "jwt_payload": {"user_id": 1234, "iat": 1516239022},
+            },
+            "response": {
+                "data": [{"id": index, "name": f"item {index}", "tags": ["a", "b"]} for index in range(items)],
+                "status_code": 200,
+            },
+            "execution": {
+                "app": "benchmark",
+                "name": "items-list",
+                "timing": {"start": now, "end": now, "duration": 0.012},
+            },
+            "info": {"git_sha": "0123456789abcdef0123456789abcdef01234567", "git_tag": "v1.2.3"},
+        }
+    )
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    settings.configure()
+    django.setup()
+
+    from restlogger.formatters import ExecutionLogFormatter, orjson
+
+    record = execution_log_record(args.items)
+    cases = [("naive", NaiveFormatter()), ("json", ExecutionLogFormatter(use_orjson=False))]
+    if orjson is not None:
+        cases.append(("orjson", ExecutionLogFormatter()))
+    for name, formatter in cases:
+        duration = min(timeit.Timer(lambda: formatter.format(record)).repeat(args.repeat, args.number)) / args.number
+        print(f"{name:>8}: {duration * 10**6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
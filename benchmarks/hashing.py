@@ -0,0 +1,64 @@
+"""
+Microbenchmark for hashing a list endpoint response, comparing the legacy md5 of the data repr,
+the streaming mode (canonical JSON fed chunk by chunk into blake2b, which lowers the peak memory but not the
+duration) and hashing the rendered content bytes.
+
+Usage:
+
+    python -m benchmarks.hashing [--items 5000] [--repeat 5] [--number 10]
+"""
+
+import argparse
+import json
+import timeit
+import tracemalloc
+
+import django
+from django.conf import settings
+
+
+def list_response_data(items: int) -> list:
+    return [
+        {"id": index, "name": f"item {index}", "tags": ["a", "b", "c"], "owner": {"id": index % 10, "active": True}}
+        for index in range(items)
+    ]
+
+
+def measure(function, repeat: int, number: int) -> tuple[float, int]:
+    duration = min(timeit.Timer(function).repeat(repeat=repeat, number=number)) / number
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    settings.configure()
+    django.setup()
+
+    from django.test import override_settings
+
+    from restlogger.utils import hash_bytes, hash_object
+
+    data = list_response_data(args.items)
+    content = json.dumps(data).encode()
+    cases = (
+        ("legacy", "legacy", lambda: hash_object(data)),
+        ("streaming", "streaming", lambda: hash_object(data)),
+        ("content", "streaming", lambda: hash_bytes(content)),
+    )
+    for name, mode, function in cases:
+        with override_settings(API_LOGGER_HASH_MODE=mode):
+            duration, peak = measure(function, args.repeat, args.number)
+        print(f"{name:>9}: {duration * 1000:8.3f} ms  peak {peak / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
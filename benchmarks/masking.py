@@ -0,0 +1,70 @@
+"""
+Microbenchmark for mask_sensitive_data, comparing the compiled sensitive-key matcher
+with the previous per-key scan over every sensitive key.
+
+Usage:
+
+    python -m benchmarks.masking [--repeat 5] [--number 20]
+"""
+
+import argparse
+import timeit
+
+import django
+from django.conf import settings
+
+SENSITIVE_KEYS = tuple(f"secret_{index}" for index in range(40)) + ("password", "token", "api_key", "iban")
+
+
+def naive_mask_sensitive_data(data):
+    """The masking implementation before the compiled matcher, kept as baseline"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if any(sensitive_key in key for sensitive_key in settings.API_LOGGER_SENSITIVE_KEYS):
+                data[key] = "***FILTERED***"
+            if isinstance(value, dict):
+                naive_mask_sensitive_data(value)
+    elif isinstance(data, list):
+        for item in data:
+            naive_mask_sensitive_data(item)
+    return data
+
+
+def wide_body(width: int = 2000) -> dict:
+    return {
+        f"field_{index % 50}_{index}": {"name": "value", "password": "x", "amount": index} for index in range(width)
+    }
+
+
+def deep_body(depth: int = 200) -> dict:
+    body: dict = {"leaf": "value", "password": "x"}
+    for index in range(depth):
+        body = {"user": "name", "email": "a@b.c", f"level_{index % 10}": body, "items": [{"token": "t", "id": index}]}
+    return body
+
+
+def run(mask, body_factory, repeat: int, number: int) -> float:
+    timer = timeit.Timer("mask(body_factory())", globals={"mask": mask, "body_factory": body_factory})
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    settings.configure(API_LOGGER_SENSITIVE_KEYS=SENSITIVE_KEYS)
+    django.setup()
+
+    from restlogger.utils import mask_sensitive_data
+
+    for name, body_factory in (("wide", wide_body), ("deep", deep_body)):
+        baseline = run(lambda body: body, body_factory, args.repeat, args.number)
+        naive = run(naive_mask_sensitive_data, body_factory, args.repeat, args.number) - baseline
+        compiled = run(mask_sensitive_data, body_factory, args.repeat, args.number) - baseline
+        print(f"{name:>5}: naive {naive * 1000:8.3f} ms  compiled {compiled * 1000:8.3f} ms  x{naive / compiled:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark of the per-request overhead of RESTRequestLoggingMiddleware, compared to calling the bare get_response,
+across request body sizes, response sizes, nesting depths, header counts, JWT on/off and hashing on/off.
+Settings and response rendering come from the test suite's conftest.py.
+
+By default each dimension is varied alone around a baseline case, use --full for the whole cartesian product.
+Results (overhead and peak allocations measured with tracemalloc) can be saved as JSON to compare runs.
+
+Usage:
+
+    python -m benchmarks.middleware [--full] [--repeat 5] [--number 200] [--output results.json]
+"""
+
+import argparse
+import dataclasses
+import itertools
+import json
+import logging
+import platform
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+
+MATRIX = {
+    "body_size": (0, 1024, 64 * 1024),
+    "response_items": (1, 100, 1000),
+    "depth": (1, 8, 32),
+    "headers": (5, 50),
+    "jwt": (False, True),
+    "hashing": (False, True),
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class Case:
+    body_size: int = 1024
+    response_items: int = 100
+    depth: int = 1
+    headers: int = 5
+    jwt: bool = False
+    hashing: bool = False
+
+    @property
+    def name(self) -> str:
+        return " ".join(f"{field}={value}" for field, value in dataclasses.asdict(self).items())
+
+
+def get_cases(full: bool) -> list[Case]:
+    if full:
+        return [Case(*values) for values in itertools.product(*MATRIX.values())]
+    cases = [Case()]
+    for field, values in MATRIX.items():
+        cases.extend(
+            dataclasses.replace(Case(), **{field: value}) for value in values if value != getattr(Case(), field)
+        )
+    return cases
+
+
+def nested(value, depth: int):
+    for level in range(depth - 1):
+        value = {"level": level, "child": value}
+    return value
+
+
+def get_response_factory(case: Case):
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.response import Response
+
+    data = [
+        nested({"id": index, "name": f"item {index}", "password": "secret"}, case.depth)
+        for index in range(case.response_items)
+    ]
+
+    def get_response(request):
+        # rendered as the response factories of conftest.py
+        response = Response(data=data)
+        response.accepted_renderer = JSONRenderer()
+        response.accepted_media_type = "application/json"
+        response.renderer_context = {}
+        return response.render()
+
+    return get_response
+
+
+def get_request_factory(case: Case):
+    import jwt
+    from rest_framework.test import APIRequestFactory
+
+    factory = APIRequestFactory()
+    item = {"name": "value", "password": "secret"}
+    item_size = len(json.dumps(item)) + 2
+    body = json.dumps([item] * (case.body_size // item_size)) if case.body_size else ""
+    headers = {f"HTTP_X_HEADER_{index}": f"value {index}" for index in range(case.headers)}
+    if case.jwt:
+        headers["HTTP_AUTHORIZATION"] = "Bearer " + jwt.encode(
+            {"user_id": 1234, "iat": 1516239022}, "benchmark-secret-" * 2
+        )
+
+    def get_request():
+        return factory.post("/api/items/", body, content_type="application/json", **headers)
+
+    return get_request
+
+
+def measure(function, repeat: int, number: int) -> tuple[float, int]:
+    duration = min(timeit.Timer(function).repeat(repeat=repeat, number=number)) / number
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak
+
+
+def run_case(case: Case, repeat: int, number: int) -> dict:
+    from django.test import override_settings
+
+    from restlogger.middleware import RESTRequestLoggingMiddleware
+
+    get_request = get_request_factory(case)
+    get_response = get_response_factory(case)
+    middleware = RESTRequestLoggingMiddleware(get_response)
+    hashing_settings = {
+        "API_LOGGER_HASH_RESPONSE_DATA": case.hashing,
+        "API_LOGGER_KEY_PATH_TO_HASH": (("response", "data"),) if case.hashing else (),
+    }
+    with override_settings(**hashing_settings):
+        bare_duration, bare_peak = measure(lambda: get_response(get_request()), repeat, number)
+        duration, peak = measure(lambda: middleware(get_request()), repeat, number)
+    return {
+        **dataclasses.asdict(case),
+        "bare_us": bare_duration * 10**6,
+        "middleware_us": duration * 10**6,
+        "overhead_us": (duration - bare_duration) * 10**6,
+        "bare_peak_kib": bare_peak / 1024,
+        "middleware_peak_kib": peak / 1024,
+        "overhead_peak_kib": (peak - bare_peak) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="run the whole cartesian product of the matrix")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--output", help="path of the JSON file to save the results to")
+    args = parser.parse_args()
+
+    from restlogger.tests import conftest
+
+    conftest.pytest_configure()
+
+    # records are built and handled, but not written anywhere
+    logger = logging.getLogger("restlogger")
+    logger.addHandler(logging.NullHandler())
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    results = []
+    for case in get_cases(args.full):
+        result = run_case(case, args.repeat, args.number)
+        results.append(result)
+        print(
+            f"{case.name:<90} overhead {result['overhead_us']:9.1f} us"
+            f"  peak +{result['overhead_peak_kib']:9.1f} KiB"
+        )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(
+                {
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "django": django.get_version(),
+                    "repeat": args.repeat,
+                    "number": args.number,
+                    "results": results,
+                },
+                output,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,169 @@
+import dataclasses
 import logging
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Mapping, Optional
 
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
-settings.API_LOGGER_ENABLED = getattr(settings, "API_LOGGER_ENABLED", True)
+if TYPE_CHECKING:
+    from .headers import HeaderCapture
+    from .routing import PathRouter
+    from .utils import SensitiveKeyMatcher
 
-settings.API_LOGGER_URL_PATH_TO_EXCLUDE = getattr(settings, "API_LOGGER_URL_PATH_TO_EXCLUDE", ())
+SETTINGS_PREFIX = "API_LOGGER_"
+INFO_SETTINGS = {"git_sha": "GIT_SHA", "git_tag": "GIT_TAG"}
 
-settings.API_LOGGER_HASH_RESPONSE_DATA = getattr(settings, "API_LOGGER_HASH_RESPONSE_DATA", True)
 
-settings.API_LOGGER_HASH_RESPONSE_ERRORS = getattr(settings, "API_LOGGER_HASH_RESPONSE_ERRORS", True)
+@dataclass(frozen=True, slots=True)
+class Config:
+    """
+    Immutable configuration of the logger, compiled once from the API_LOGGER_* settings (each field is the setting
+    name without prefix, in lower case), or built directly (e.g. by tests) with the same normalization:
+    collections are converted to tuples, the default sensitive key is added, the key paths to hash, the highest
+    log level, the path router, the header capture and the sensitive key matcher are precomputed.
+    The Django settings are never modified
+    """
 
-settings.API_LOGGER_KEY_PATH_TO_HASH = getattr(settings, "API_LOGGER_KEY_PATH_TO_HASH", ())
+    enabled: bool = True
+    url_path_to_exclude: tuple = ()
+    url_path_to_include: tuple = ()
+    url_path_rules: Mapping = field(default_factory=lambda: MappingProxyType({}))
+    url_path_regex_rules: Mapping = field(default_factory=lambda: MappingProxyType({}))
+    hash_response_data: bool = True
+    hash_response_errors: bool = True
+    key_path_to_hash: tuple = ()
+    hash_mode: str = "legacy"
+    hash_response_content: bool = False
+    hash_max_size: Optional[int] = None
+    sensitive_keys: tuple = ()
+    default_log_level: int = logging.INFO
+    client_error_log_level: Optional[int] = None
+    server_error_log_level: Optional[int] = None
+    slow_request_threshold: Optional[float] = None
+    slow_request_log_level: int = logging.WARNING
+    app_name: str = ""
+    queue_enabled: bool = False
+    queue_capacity: int = 10000
+    queue_drop_policy: str = "drop_newest"
+    lazy_record: bool = False
+    max_body_size: Optional[int] = 64 * 1024
+    max_response_size: Optional[int] = 1024 * 1024
+    request_body_content_types: tuple = ("application/json", "application/*+json")
+    payload_max_depth: Optional[int] = 64
+    payload_max_items: Optional[int] = None
+    payload_max_list_items: Optional[int] = None
+    payload_max_string_length: Optional[int] = None
+    sample_rate: float = 1.0
+    sample_keep_client_errors: bool = True
+    sample_keep_server_errors: bool = True
+    jwt_cache_size: int = 1024
+    headers_to_include: Optional[tuple] = None
+    headers_to_exclude: tuple = ()
+    headers_to_redact: tuple = ("Authorization", "Proxy-Authorization", "Cookie")
+    server_timing: bool = False
+    db_queries: bool = False
+    metrics_enabled: bool = False
+    metrics_interval: float = 60
+    log_overhead: bool = False
+    info: Mapping = field(default_factory=lambda: MappingProxyType({}))
+    hashed_key_paths: tuple = field(init=False)
+    max_log_level: int = field(init=False)
+    path_router: "PathRouter" = field(init=False, repr=False, compare=False)
+    header_capture: "HeaderCapture" = field(init=False, repr=False, compare=False)
+    sensitive_key_matcher: "SensitiveKeyMatcher" = field(init=False, repr=False, compare=False)
 
-if settings.API_LOGGER_HASH_RESPONSE_DATA:
-    settings.API_LOGGER_KEY_PATH_TO_HASH += (("response", "data"),)
+    def __post_init__(self):
+        from .headers import HeaderCapture
+        from .routing import PathRouter
+        from .utils import SensitiveKeyMatcher
 
-settings.API_LOGGER_SENSITIVE_KEYS = getattr(settings, "API_LOGGER_SENSITIVE_KEYS", ())
+        def set_field(name, value):
+            object.__setattr__(self, name, value)
 
-settings.API_LOGGER_SENSITIVE_KEYS += ("password",)
+        for name in ("url_path_to_exclude", "url_path_to_include", "request_body_content_types", "headers_to_exclude"):
+            set_field(name, tuple(getattr(self, name)))
+        for name in ("headers_to_include", "headers_to_redact"):
+            if getattr(self, name) is not None:
+                set_field(name, tuple(getattr(self, name)))
+        for name in ("url_path_rules", "url_path_regex_rules"):
+            set_field(name, MappingProxyType(dict(getattr(self, name))))
+        set_field("info", MappingProxyType({name: value for name, value in self.info.items() if value}))
 
-settings.API_LOGGER_DEFAULT_LOG_LEVEL = getattr(settings, "API_LOGGER_DEFAULT_LOG_LEVEL", logging.INFO)
+        set_field("key_path_to_hash", tuple(dict.fromkeys(tuple(key_path) for key_path in self.key_path_to_hash)))
+        hashed_key_paths = self.key_path_to_hash + ((("response", "data"),) if self.hash_response_data else ())
+        set_field("hashed_key_paths", tuple(dict.fromkeys(hashed_key_paths)))
+        set_field("sensitive_keys", tuple(dict.fromkeys((*self.sensitive_keys, "password"))))
 
-settings.API_LOGGER_APP_NAME = getattr(settings, "API_LOGGER_APP_NAME", "")
+        levels = [self.default_log_level, self.client_error_log_level, self.server_error_log_level]
+        if self.slow_request_threshold is not None:
+            levels.append(self.slow_request_log_level)
+        set_field("max_log_level", max(level for level in levels if level is not None))
+
+        set_field(
+            "path_router",
+            PathRouter(
+                exclude=self.url_path_to_exclude,
+                include=self.url_path_to_include,
+                rules=self.url_path_rules,
+                regex_rules=self.url_path_regex_rules,
+            ),
+        )
+        set_field(
+            "header_capture",
+            HeaderCapture(
+                include=self.headers_to_include, exclude=self.headers_to_exclude, redact=self.headers_to_redact
+            ),
+        )
+        set_field("sensitive_key_matcher", SensitiveKeyMatcher(self.sensitive_keys))
+
+    @classmethod
+    def from_settings(cls) -> "Config":
+        """
+        Build the configuration from the Django settings, falling back to the defaults for the missing ones
+        """
+        defaults = cls()
+        values = {
+            name: getattr(settings, SETTINGS_PREFIX + name.upper(), getattr(defaults, name)) for name in SETTING_FIELDS
+        }
+        values["info"] = {field: getattr(settings, setting, "") for field, setting in INFO_SETTINGS.items()}
+        return cls(**values)
+
+
+SETTING_FIELDS = tuple(
+    config_field.name
+    for config_field in dataclasses.fields(Config)
+    if config_field.init and config_field.name != "info"
+)
+
+
+# the compiled Config, with the settings holder it was compiled from
+_config: Optional[tuple[object, Config]] = None
+_config_lock = threading.Lock()
+
+
+def get_config() -> Config:
+    """
+    Return the Config compiled from settings, built once and rebuilt when the settings change:
+    on setting_changed, or when the settings holder is replaced without signal (e.g. override_settings
+    deleting a setting)
+    """
+    global _config
+    compiled = _config
+    if compiled is None or compiled[0] is not settings._wrapped:
+        with _config_lock:
+            compiled = _config
+            if compiled is None or compiled[0] is not settings._wrapped:
+                config = Config.from_settings()
+                compiled = _config = (settings._wrapped, config)
+    return compiled[1]
+
+
+@receiver(setting_changed)
+def reset_config(setting, **kwargs):
+    global _config
+    if setting.startswith(SETTINGS_PREFIX) or setting in INFO_SETTINGS.values():
+        _config = None
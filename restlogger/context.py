@@ -0,0 +1,208 @@
+import contextlib
+import contextvars
+import datetime
+import time
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+
+@dataclass(slots=True)
+class LogStep:
+    """DataClass to represent a single Log Step"""
+
+    msg: str
+    detail: dict = field(default_factory=dict)
+
+    def __str__(self):
+        return self.msg
+
+    def to_dict(self) -> dict:
+        """Serialize the step, without copying its detail"""
+        return {"msg": self.msg, "detail": self.detail}
+
+
+@dataclass(slots=True)
+class TimingStep:
+    """
+    DataClass to represent a single Timing Step, measured in nanoseconds with a monotonic clock.
+    A step can be started and stopped many times: its count and total duration are accumulated
+    """
+
+    start: int = 0
+    end: Optional[int] = None
+    count: int = 0
+    total_ns: int = 0
+    running: bool = False
+
+    def __post_init__(self):
+        self.restart()
+
+    def restart(self):
+        self.start = time.perf_counter_ns()
+        self.running = True
+
+    def stop(self):
+        if self.running:
+            self.end = time.perf_counter_ns()
+            self.total_ns += self.end - self.start
+            self.count += 1
+            self.running = False
+
+    @property
+    def duration(self) -> float:
+        """Total duration in seconds, 0 if the step was never stopped"""
+        return self.total_ns / 1e9
+
+    @property
+    def total(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=self.duration)
+
+
+class ExecutionLog:
+    """
+    Execution info collected while serving a request (task info, log steps and timing steps),
+    added to the execution log record by the middleware
+    """
+
+    __slots__ = ("task_info", "log_steps", "timing_steps")
+
+    def __init__(self) -> None:
+        self.task_info: dict = {}
+        self.log_steps: list[LogStep] = []
+        self.timing_steps: dict[str, TimingStep] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.task_info or self.log_steps or self.timing_steps)
+
+    def add_task_info(self, task_info: dict):
+        """Update the task info with the given data"""
+        self.task_info.update(task_info)
+
+    def add_log_step(self, msg: str, detail: Optional[dict] = None):
+        """Append a LogStep"""
+        if not detail:
+            detail = {}
+        self.log_steps.append(LogStep(msg, detail))
+
+    def start_timing_step(self, name: str):
+        """Starts a timing step with the given name, accumulating into it if it was already timed"""
+        if (timing_step := self.timing_steps.get(name)) is None:
+            self.timing_steps[name] = TimingStep()
+        else:
+            timing_step.restart()
+
+    def stop_timing_step(self, name: str):
+        """Stops a timing step with the given name, if any"""
+        if timing_step := self.timing_steps.get(name):
+            timing_step.stop()
+
+    @contextlib.contextmanager
+    def timing_step(self, name: str):
+        """
+        Context manager timing its block as the timing step with the given name.
+        Steps can be nested, and a block re-entering a step that is already running is timed by the outer one
+        """
+        timing_step = self.timing_steps.get(name)
+        if timing_step is not None and timing_step.running:
+            yield timing_step
+            return
+        self.start_timing_step(name)
+        try:
+            yield self.timing_steps[name]
+        finally:
+            self.stop_timing_step(name)
+
+    def get_log_steps(self) -> list:
+        """Return the serialized LogSteps"""
+        return [step.to_dict() for step in self.log_steps]
+
+    def get_timing_steps(self) -> dict:
+        """Returns the durations of all TimingSteps, except the null ones"""
+        return {name: timing_step.duration for name, timing_step in self.timing_steps.items() if timing_step.duration}
+
+    def get_timing_step_counts(self) -> dict:
+        """Returns how many times each TimingStep was timed, for the steps timed more than once"""
+        return {name: timing_step.count for name, timing_step in self.timing_steps.items() if timing_step.count > 1}
+
+    def to_dict(self) -> dict:
+        """Returns an object with task_info, log_steps and timing_steps"""
+        execution_log_info = {
+            "task_info": self.task_info,
+            "log_steps": self.get_log_steps(),
+            "timing_steps": self.get_timing_steps(),
+        }
+        if timing_step_counts := self.get_timing_step_counts():
+            execution_log_info["timing_step_counts"] = timing_step_counts
+        return execution_log_info
+
+
+_execution_log: contextvars.ContextVar[Optional[ExecutionLog]] = contextvars.ContextVar(
+    "restlogger_execution_log", default=None
+)
+
+
+def get_execution_log() -> Optional[ExecutionLog]:
+    """
+    Return the ExecutionLog of the current request, if any
+    """
+    return _execution_log.get()
+
+
+@contextlib.contextmanager
+def execution_log_scope(reuse: bool = True) -> Iterator[ExecutionLog]:
+    """
+    Open an ExecutionLog for the block, or reuse the one already open unless reuse is False. The ExecutionLog
+    is held in a context variable, so it is shared with the code run by the block, including through sync_to_async
+    """
+    if reuse and (execution_log := _execution_log.get()) is not None:
+        yield execution_log
+        return
+    execution_log = ExecutionLog()
+    token = _execution_log.set(execution_log)
+    try:
+        yield execution_log
+    finally:
+        _execution_log.reset(token)
+
+
+def add_task_info(task_info: dict):
+    """Update the task info of the current request, if any"""
+    if (execution_log := _execution_log.get()) is not None:
+        execution_log.add_task_info(task_info)
+
+
+def add_log_step(msg: str, detail: Optional[dict] = None):
+    """Append a LogStep to the execution log of the current request, if any"""
+    if (execution_log := _execution_log.get()) is not None:
+        execution_log.add_log_step(msg, detail)
+
+
+def start_timing_step(name: str):
+    """Starts a timing step with the given name in the execution log of the current request, if any"""
+    if (execution_log := _execution_log.get()) is not None:
+        execution_log.start_timing_step(name)
+
+
+def stop_timing_step(name: str):
+    """Stops a timing step with the given name in the execution log of the current request, if any"""
+    if (execution_log := _execution_log.get()) is not None:
+        execution_log.stop_timing_step(name)
+
+
+@contextlib.contextmanager
+def timing_step(name: str):
+    """
+    Time the block, or each call of the decorated function, as the timing step with the given name
+    in the execution log of the current request, if any
+
+    Example:
+
+        @timing_step("pricing")
+        def compute_prices(items):
+            ...
+    """
+    if (execution_log := _execution_log.get()) is None:
+        yield None
+        return
+    with execution_log.timing_step(name) as step:
+        yield step
@@ -0,0 +1,121 @@
+import contextlib
+import contextvars
+import functools
+import re
+import time
+from collections import Counter
+from typing import Iterator, Optional
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .conf import get_config
+
+SQL_STRING_LITERALS = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER_LITERALS = re.compile(r"\b\d+(?:\.\d+)?\b")
+SQL_PLACEHOLDERS = re.compile(r"%s|%\(\w+\)s|\?")
+SQL_PLACEHOLDER_LISTS = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+SQL_WHITESPACES = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=256)
+def normalize_sql(sql: str) -> str:
+    """
+    Return the given SQL with literals and placeholders replaced by "?", so that queries differing only
+    by their parameters (e.g. the N queries of an N+1) are normalized to the same statement
+    """
+    sql = SQL_STRING_LITERALS.sub("?", sql)
+    sql = SQL_NUMBER_LITERALS.sub("?", sql)
+    sql = SQL_PLACEHOLDERS.sub("?", sql)
+    sql = SQL_PLACEHOLDER_LISTS.sub("(...)", sql)
+    return SQL_WHITESPACES.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """
+    Statistics of the database queries executed while a request is served, on any database alias
+    """
+
+    __slots__ = ("count", "duration", "slowest_sql", "slowest_duration", "_statements")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_sql: Optional[str] = None
+        self.slowest_duration = 0.0
+        self._statements: Counter = Counter()
+
+    def add(self, sql: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self._statements[sql] += 1
+        if self.slowest_sql is None or duration > self.slowest_duration:
+            self.slowest_sql = sql
+            self.slowest_duration = duration
+
+    @property
+    def duplicates(self) -> int:
+        """Number of queries repeating an already executed statement, with other parameters or not"""
+        return self.count - len(self._statements)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "duration": self.duration,
+            "duplicates": self.duplicates,
+            "slowest": (
+                {"sql": normalize_sql(self.slowest_sql), "duration": self.slowest_duration}
+                if self.slowest_sql is not None
+                else None
+            ),
+        }
+
+
+_query_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar(
+    "restlogger_query_stats", default=None
+)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing the query into the QueryStats of the current request, if any.
+    The stats are held in a context variable, so that queries run by sync_to_async threads are tracked too
+    """
+    if (query_stats := _query_stats.get()) is None:
+        return execute(sql, params, many, context)
+    start_ns = time.perf_counter_ns()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        query_stats.add(sql, (time.perf_counter_ns() - start_ns) / 1e9)
+
+
+def install_execute_wrapper(connection):
+    """
+    Install record_query on the given connection, once. It is inserted as the outermost wrapper, not to
+    interfere with wrappers pushed and popped by connection.execute_wrapper()
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@receiver(connection_created)
+def install_execute_wrapper_on_connection_created(sender, connection, **kwargs):
+    if get_config().db_queries:
+        install_execute_wrapper(connection)
+
+
+@contextlib.contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Collect QueryStats for the database queries executed inside the block, across all database aliases
+    """
+    for alias in connections:
+        install_execute_wrapper(connections[alias])
+    query_stats = QueryStats()
+    token = _query_stats.set(query_stats)
+    try:
+        yield query_stats
+    finally:
+        _query_stats.reset(token)
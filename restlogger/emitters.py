@@ -0,0 +1,115 @@
+import atexit
+import collections
+import logging
+import os
+import threading
+from collections.abc import Mapping
+from typing import Optional
+
+from .conf import get_config
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+
+
+class QueueEmitter:
+    """
+    Emits log records from a background worker thread, reading them from a bounded in-process queue.
+    When the queue is full, either the incoming record (drop_newest) or the oldest queued one (drop_oldest)
+    is discarded and counted in `dropped`, so the caller never waits on the logging handlers.
+    """
+
+    def __init__(self, capacity: int = 10000, drop_policy: str = DROP_NEWEST):
+        if drop_policy not in (DROP_NEWEST, DROP_OLDEST):
+            raise ValueError(f"Invalid drop policy: {drop_policy}")
+        self.capacity = capacity
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self.emitted = 0
+        self._queue: collections.deque = collections.deque()
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stopping = False
+
+    def emit(self, logger: logging.Logger, level: int, msg: str, extra: Mapping):
+        """Enqueue a record to be logged by the worker thread, dropping one if the queue is full"""
+        with self._condition:
+            self._ensure_worker()
+            if len(self._queue) >= self.capacity:
+                self.dropped += 1
+                if self.drop_policy == DROP_NEWEST:
+                    return
+                self._queue.popleft()
+                self._pending -= 1
+            self._queue.append((logger, level, msg, extra))
+            self._pending += 1
+            self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued record has been emitted, returns False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending, timeout)
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Flush the queue and stop the worker thread"""
+        with self._condition:
+            thread = self._thread
+            if thread is None or self._pid != os.getpid():
+                return
+            self._stopping = True
+            self._condition.notify_all()
+        thread.join(timeout)
+        with self._condition:
+            self._thread = None
+            self._stopping = False
+
+    def stats(self) -> dict:
+        """Return counters about the queue usage"""
+        with self._condition:
+            return {"queued": len(self._queue), "emitted": self.emitted, "dropped": self.dropped}
+
+    def _ensure_worker(self):
+        """Start the worker thread if needed, also after a fork (e.g. preloaded gunicorn workers)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        if self._pid is None:
+            atexit.register(self.stop)
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="restlogger-emitter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._stopping)
+                if not self._queue and self._stopping:
+                    return
+                batch = list(self._queue)
+                self._queue.clear()
+            try:
+                for logger, level, msg, extra in batch:
+                    logger.log(level, msg, extra=extra)
+            finally:
+                with self._condition:
+                    self.emitted += len(batch)
+                    self._pending -= len(batch)
+                    self._condition.notify_all()
+
+
+_queue_emitter: Optional[QueueEmitter] = None
+_queue_emitter_lock = threading.Lock()
+
+
+def get_queue_emitter() -> QueueEmitter:
+    """
+    Return the process wide QueueEmitter, creating it from settings on first use
+    """
+    global _queue_emitter
+    if _queue_emitter is None:
+        with _queue_emitter_lock:
+            if _queue_emitter is None:
+                config = get_config()
+                _queue_emitter = QueueEmitter(capacity=config.queue_capacity, drop_policy=config.queue_drop_policy)
+    return _queue_emitter
@@ -0,0 +1,106 @@
+import datetime
+import json
+import logging
+from collections.abc import Mapping
+from typing import Iterable, Optional
+
+from .records import LazySection
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+RECORD_SECTIONS = (
+    "request",
+    "response",
+    "task",
+    "execution",
+    "task_info",
+    "log_steps",
+    "timing_steps",
+    "timing_step_counts",
+    "metrics",
+    "logger_overhead",
+)
+STATIC_SECTIONS = ("info",)
+
+
+def _default(object):
+    """Serialize what JSON does not know: lazy sections, datetimes, and anything else (e.g. request.user) as str"""
+    if isinstance(object, LazySection):
+        return object.data
+    if isinstance(object, Mapping):
+        return dict(object)
+    if isinstance(object, (datetime.date, datetime.time)):
+        return object.isoformat()
+    return str(object)
+
+
+_json_encoder = json.JSONEncoder(separators=(",", ":"), default=_default, ensure_ascii=False)
+
+
+class ExecutionLogFormatter(logging.Formatter):
+    """
+    Formats the records of RESTRequestLoggingMiddleware (and of the execution metrics) as a single JSON line,
+    with the timestamp, level, logger name, message and the execution log sections of the record.
+    The record is serialized in a single pass with orjson when it is installed (pip install restlogger[orjson]),
+    with the json module otherwise. Static sections (the "info" one) are only encoded when they change
+    """
+
+    def __init__(
+        self,
+        sections: Iterable[str] = RECORD_SECTIONS,
+        static_sections: Iterable[str] = STATIC_SECTIONS,
+        use_orjson: bool = True,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.sections = tuple(sections)
+        self.static_sections = tuple(static_sections)
+        self.use_orjson = use_orjson and orjson is not None
+        self._static_cache: dict[str, tuple[dict, str]] = {}
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "timestamp": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in self.sections:
+            if (section := record.__dict__.get(name)) is not None:
+                data[name] = section
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        encoded = self.dumps(data)
+        static_fragments = [
+            f',"{name}":{self._get_static_fragment(name, section)}'
+            for name in self.static_sections
+            if (section := record.__dict__.get(name)) is not None
+        ]
+        if static_fragments:
+            encoded = f"{encoded[:-1]}{''.join(static_fragments)}}}"
+        return encoded
+
+    def dumps(self, data) -> str:
+        if self.use_orjson:
+            try:
+                return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+            except TypeError:
+                # e.g. integers larger than 64 bits, which the json module supports
+                pass
+        return _json_encoder.encode(data)
+
+    def _get_static_fragment(self, name: str, section) -> str:
+        """Return the encoded section, encoding it again only if it changed since the last record"""
+        if isinstance(section, LazySection):
+            section = section.data
+        if not isinstance(section, Mapping):
+            return self.dumps(section)
+        cached: Optional[tuple[dict, str]] = self._static_cache.get(name)
+        if cached is None or cached[0] != section:
+            cached = self._static_cache[name] = (dict(section), self.dumps(section))
+        return cached[1]
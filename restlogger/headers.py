@@ -0,0 +1,53 @@
+import functools
+from typing import Iterable, Mapping, Optional
+
+from django.http.request import HttpHeaders
+
+from .utils import FILTERED
+
+
+def get_meta_key(header: str) -> str:
+    """
+    Return the request.META key of the given header name (e.g. "X-Request-Id" -> "HTTP_X_REQUEST_ID")
+    """
+    meta_key = header.replace("-", "_").upper()
+    return meta_key if meta_key in HttpHeaders.UNPREFIXED_HEADERS else HttpHeaders.HTTP_PREFIX + meta_key
+
+
+@functools.lru_cache(maxsize=256)
+def get_header_name(meta_key: str) -> Optional[str]:
+    """
+    Return the header name of the given request.META key, the same as request.headers, or None if it is not a header
+    """
+    return HttpHeaders.parse_header_name(meta_key)
+
+
+class HeaderCapture:
+    """
+    Selects the request headers to log.
+    Header names are compiled once into request.META keys: with an allowlist only those keys are looked up,
+    otherwise every header but the denied ones is captured. Values of the headers to redact are masked
+    """
+
+    def __init__(
+        self, include: Optional[Iterable[str]] = None, exclude: Iterable[str] = (), redact: Iterable[str] = ()
+    ):
+        self._include = None
+        if include is not None:
+            self._include = tuple((meta_key, get_header_name(meta_key)) for meta_key in map(get_meta_key, include))
+        self._exclude = frozenset(map(get_meta_key, exclude))
+        self._redact = frozenset(map(get_meta_key, redact))
+
+    def capture(self, meta: Mapping) -> dict:
+        """Return the headers to log from the given request.META"""
+        headers = {}
+        if self._include is not None:
+            for meta_key, name in self._include:
+                if meta_key in meta and meta_key not in self._exclude:
+                    headers[name] = FILTERED if meta_key in self._redact else meta[meta_key]
+            return headers
+        for meta_key, value in meta.items():
+            if meta_key in self._exclude or (name := get_header_name(meta_key)) is None:
+                continue
+            headers[name] = FILTERED if meta_key in self._redact else value
+        return headers
@@ -0,0 +1,160 @@
+import atexit
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from .conf import Config, get_config
+
+log = logging.getLogger("restlogger")
+
+HISTOGRAM_SUB_BUCKET_BITS = 7
+HISTOGRAM_MAX_VALUE = 3600 * 10**6
+PERCENTILES = (50, 90, 99)
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of latencies, recorded in microseconds with fixed memory.
+    Each power of two range is split into the same number of linear sub-buckets, so that every recorded
+    value is known with a bounded relative error (below 1 / 2 ** (sub_bucket_bits - 1))
+    """
+
+    __slots__ = ("sub_bucket_bits", "max_value", "counts", "count", "total", "max")
+
+    def __init__(self, sub_bucket_bits: int = HISTOGRAM_SUB_BUCKET_BITS, max_value: int = HISTOGRAM_MAX_VALUE):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value = max_value
+        self.counts = [0] * (self._get_index(max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def _get_index(self, value: int) -> int:
+        shift = max(value.bit_length() - self.sub_bucket_bits, 0)
+        return (value >> shift) + (shift << (self.sub_bucket_bits - 1))
+
+    def _get_value(self, index: int) -> int:
+        """Return the middle value of the bucket at the given index"""
+        half_sub_bucket_count = 1 << (self.sub_bucket_bits - 1)
+        shift = max(index // half_sub_bucket_count - 1, 0)
+        sub_bucket = index - (shift << (self.sub_bucket_bits - 1))
+        return (sub_bucket << shift) + (1 << shift >> 1)
+
+    def record(self, duration: float):
+        """Record a duration, given in seconds"""
+        value = min(max(round(duration * 10**6), 0), self.max_value)
+        self.counts[self._get_index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, histogram: "LatencyHistogram"):
+        for index, count in enumerate(histogram.counts):
+            self.counts[index] += count
+        self.count += histogram.count
+        self.total += histogram.total
+        self.max = max(self.max, histogram.max)
+
+    def percentile(self, percentile: float) -> float:
+        """Return the given percentile of the recorded durations, in seconds"""
+        if not self.count:
+            return 0.0
+        target = max(math.ceil(percentile / 100 * self.count), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._get_value(index), self.max) / 10**6
+        return self.max / 10**6
+
+    def to_dict(self) -> dict:
+        summary: dict = {"count": self.count}
+        summary.update({f"p{percentile}": self.percentile(percentile) for percentile in PERCENTILES})
+        summary["max"] = self.max / 10**6
+        return summary
+
+
+def get_status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+class MetricsAggregator:
+    """
+    Aggregates request latencies per view name and status class within each worker, and emits a summary
+    record every `interval` seconds. The summary is emitted by the first request recorded after the interval
+    elapsed (and at exit), so that no background thread is needed.
+    The log level and app name are read from the given config, or the one compiled from settings
+    """
+
+    def __init__(self, interval: float, config: Optional[Config] = None):
+        self.interval = interval
+        self.config = config
+        self._histograms: dict[tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._start_time = datetime.now(timezone.utc)
+
+    def record(self, view_name: str, status_code: int, duration: float):
+        key = (view_name, get_status_class(status_code))
+        with self._lock:
+            if (histogram := self._histograms.get(key)) is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(duration)
+            should_flush = time.monotonic() - self._started_at >= self.interval
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Emit the summary of the current interval, if any request was recorded, and start a new one"""
+        with self._lock:
+            histograms, self._histograms = self._histograms, {}
+            start_time, self._start_time = self._start_time, datetime.now(timezone.utc)
+            self._started_at = time.monotonic()
+        if histograms:
+            config = self.config or get_config()
+            summary = self.get_summary(histograms, start_time, self._start_time, config)
+            log.log(config.default_log_level, "Execution Metrics", extra={"metrics": summary})
+
+    @staticmethod
+    def get_summary(
+        histograms: dict, start_time: datetime, end_time: datetime, config: Optional[Config] = None
+    ) -> dict:
+        views: dict[str, dict] = {}
+        for (view_name, status_class), histogram in sorted(histograms.items()):
+            view = views.setdefault(view_name, {"histogram": LatencyHistogram(), "errors": 0, "statuses": {}})
+            view["histogram"].merge(histogram)
+            view["statuses"][status_class] = histogram.to_dict()
+            if status_class == "5xx":
+                view["errors"] += histogram.count
+        return {
+            "app": (config or get_config()).app_name,
+            "timing": {"start": start_time, "end": end_time},
+            "views": {
+                view_name: {
+                    **view["histogram"].to_dict(),
+                    "error_rate": view["errors"] / view["histogram"].count,
+                    "statuses": view["statuses"],
+                }
+                for view_name, view in views.items()
+            },
+        }
+
+
+_metrics_aggregator: Optional[MetricsAggregator] = None
+_metrics_aggregator_lock = threading.Lock()
+
+
+def get_metrics_aggregator() -> MetricsAggregator:
+    """
+    Return the process wide MetricsAggregator, creating it from settings on first use
+    """
+    global _metrics_aggregator
+    if _metrics_aggregator is None:
+        with _metrics_aggregator_lock:
+            if _metrics_aggregator is None:
+                _metrics_aggregator = MetricsAggregator(interval=get_config().metrics_interval)
+                atexit.register(_metrics_aggregator.flush)
+    return _metrics_aggregator
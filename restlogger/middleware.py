@@ -1,60 +1,405 @@
+import asyncio
 import contextlib
-import copy
 import json
 import logging
-from datetime import datetime, timezone
-from json import JSONDecodeError
-from typing import Callable, Dict
+import re
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Union
 
-from rest_framework.status import is_client_error
+from asgiref.sync import sync_to_async
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.status import is_client_error, is_server_error
+
+from .conf import Config, get_config
+from .context import execution_log_scope
+from .db import QueryStats, track_queries
+from .emitters import QueueEmitter, get_queue_emitter
+from .metrics import MetricsAggregator, get_metrics_aggregator
+from .parsers import ResponseParser, response_parsers
+from .records import ExecutionLogRecord, LazySection, OverheadTimer, time_phase
+from .routing import DEFAULT_ROUTE_RULE, RouteRule
+from .sampling import SamplingDecision
+from .utils import (
+    JWTPayloadCache,
+    get_jwt_token_payload,
+    hash_bytes,
+    match_media_type,
+    redact,
+)
+
+try:
+    from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+except ImportError:  # pragma: no cover
+    # asgiref < 3.6: mark coroutine functions the way asyncio.iscoroutinefunction recognizes them
+    from asyncio import iscoroutinefunction  # type: ignore[assignment]
+
+    def markcoroutinefunction(func):  # type: ignore[misc]
+        func._is_coroutine = asyncio.coroutines._is_coroutine  # type: ignore[attr-defined]
+        return func
 
-from .conf import settings
-from .utils import apply_hash_filter, decode_jwt_token_payload, exclude_path, mask_sensitive_data
 
 log = logging.getLogger("restlogger")
 
+SERVER_TIMING_INVALID_NAME_CHARS = re.compile(r"[^!#$%&'*+\-.^_`|~0-9A-Za-z]")
+
+
+@dataclass
+class RequestCycle:
+    """DataClass to represent the state collected by the middleware around the call to the view"""
+
+    sampling: SamplingDecision
+    overhead: Optional[OverheadTimer]
+    cached_request_body: Union[bytes, dict, str]
+    start_time: datetime = datetime.min
+    duration: float = 0.0
+    query_stats: Optional[QueryStats] = None
+
 
 class RESTRequestLoggingMiddleware:
     """
     Django Middleware for logging some detailed info of the request/response cycle
     Best suited for using with Django REST Framework (DRF)
+
+    Supports both WSGI and ASGI: when the next handler in the chain is a coroutine,
+    the middleware runs natively in async mode and never wraps the view with sync_to_async.
+    The configuration is compiled from settings, unless a Config is given (e.g. by tests): the middleware then
+    uses its own queue emitter, metrics aggregator and JWT cache, instead of the process wide ones built from settings
     """
 
+    sync_capable = True
+    async_capable = True
+
     extra_log_info: Dict[dict, dict] = {}
     view_name: str = ""
 
-    def __init__(self, get_response: Callable):
+    def __init__(self, get_response: Callable, config: Optional[Config] = None):
         self.get_response = get_response
+        self.config = config
+        self._queue_emitter: Optional[QueueEmitter] = None
+        self._metrics_aggregator: Optional[MetricsAggregator] = None
+        self._jwt_payload_cache: Optional[JWTPayloadCache] = None
+        if config is not None:
+            self._queue_emitter = QueueEmitter(capacity=config.queue_capacity, drop_policy=config.queue_drop_policy)
+            self._metrics_aggregator = MetricsAggregator(interval=config.metrics_interval, config=config)
+            self._jwt_payload_cache = JWTPayloadCache(max_size=config.jwt_cache_size)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        should_log = settings.API_LOGGER_ENABLED and not exclude_path(request.path)
+        if self.async_mode:
+            return self.__acall__(request)
 
-        if should_log:
-            return self.get_respose_and_log_info(request)
+        config = self._get_config()
+        if route := self._get_route(request, config):
+            return self.get_respose_and_log_info(request, route, config)
         else:
             return self.get_response(request)
 
-    def get_respose_and_log_info(self, request):
+    async def __acall__(self, request):
+        config = self._get_config()
+        if route := self._get_route(request, config):
+            return await self.aget_response_and_log_info(request, route, config)
+        else:
+            return await self.get_response(request)
+
+    def _get_config(self) -> Config:
+        return self.config if self.config is not None else get_config()
+
+    @staticmethod
+    def _get_route(request, config: Config) -> Optional[RouteRule]:
+        """
+        Return the logging rule for the request path, or None if the request must not be logged.
+        If the logger is not enabled even for the highest level of the level policy, nothing is collected
+        """
+        if not config.enabled or not log.isEnabledFor(config.max_log_level):
+            return None
+        route = config.path_router.match(request.path)
+        if route is None or not route.enabled:
+            return None
+        return route
+
+    @staticmethod
+    def _get_log_level(response, duration: float, config: Config) -> int:
+        """
+        Level to use for the execution log, escalated by the response status and the request duration
+        """
+        levels: list[Optional[int]] = [config.default_log_level]
+        if is_client_error(response.status_code):
+            levels.append(config.client_error_log_level)
+        elif is_server_error(response.status_code):
+            levels.append(config.server_error_log_level)
+        slow_request_threshold = config.slow_request_threshold
+        if slow_request_threshold is not None and duration >= slow_request_threshold:
+            levels.append(config.slow_request_log_level)
+        return max(level for level in levels if level is not None)
+
+    def get_respose_and_log_info(
+        self, request, route: RouteRule = DEFAULT_ROUTE_RULE, config: Optional[Config] = None
+    ):
         """
         Collect and filter all data to log, get response and return it
         """
-        cached_request_body = copy.copy(request.body)
-        start_time = datetime.now(timezone.utc)
-        response = self.get_response(request)
-        finish_time = datetime.now(timezone.utc)
-        data = self._get_request_info(request, cached_request_body)
-        data.update(self._get_response_info(response))
-        data.update(self._get_execution_fields(request, start_time, finish_time))
-        data.update(self._get_info_fields())
-        if self._should_apply_hash_filter(data):
-            apply_hash_filter(data)
-        with contextlib.suppress(AttributeError):
-            data.update(request.execution_log_info)
-        log.info("Execution Log", extra=data)
+        config = config or self._get_config()
+        cycle = self._start_cycle(request, route, config)
+        with self._measure_cycle(request, cycle, config):
+            response = self.get_response(request)
+        if (log_info_args := self._finish_cycle(request, response, route, cycle, config)) is not None:
+            self._log_info(*log_info_args, user=self._get_user(request))
+        return response
+
+    async def aget_response_and_log_info(
+        self, request, route: RouteRule = DEFAULT_ROUTE_RULE, config: Optional[Config] = None
+    ):
+        """
+        Async counterpart of get_respose_and_log_info: the response is awaited directly, while
+        parsing, masking, hashing and emission run in a worker thread to keep the event loop free,
+        unless a lazy record is handed to the background queue, which builds it in its own thread
+        """
+        config = config or self._get_config()
+        cycle = self._start_cycle(request, route, config)
+        with self._measure_cycle(request, cycle, config):
+            response = await self.get_response(request)
+        if (log_info_args := self._finish_cycle(request, response, route, cycle, config)) is None:
+            return response
+        user = await self._aget_user(request)
+        if config.queue_enabled and config.lazy_record:
+            # the sections are only evaluated by the queue worker, nothing heavy runs on the event loop
+            self._log_info(*log_info_args, user=user)
+        else:
+            await sync_to_async(self._log_info, thread_sensitive=False)(*log_info_args, user=user)
         return response
 
-    def _should_apply_hash_filter(self, data) -> bool:
-        status_code = data.get("response", {}).get("status_code")
+    @staticmethod
+    def _get_user(request) -> Optional[str]:
+        """
+        The user of the request as a plain value, resolved in the thread handling the request: records are
+        built later, possibly in another thread, where request-bound state such as the lazy authentication
+        lookup (and its database connection) must not be touched
+        """
+        try:
+            user = request.user
+        except AttributeError:
+            return None
+        return None if user is None else str(user)
+
+    async def _aget_user(self, request) -> Optional[str]:
+        """
+        Async counterpart of _get_user: a user not loaded yet is loaded in the thread running the sync code
+        of the request, whose database connections Django closes when the request finishes
+        """
+        user = getattr(request, "user", None)
+        if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+            return await sync_to_async(self._get_user)(request)
+        return self._get_user(request)
+
+    def _start_cycle(self, request, route: RouteRule, config: Config) -> RequestCycle:
+        """
+        Take the head sampling decision and read the request body, before the view consumes the stream
+        """
+        sampling = SamplingDecision.head(route, config)
+        overhead = OverheadTimer() if config.log_overhead else None
+        with time_phase(overhead, "body_copy"):
+            cached_request_body = (
+                self._read_request_body(request, route, config) if sampling.head_sampled else "Body not sampled"
+            )
+        return RequestCycle(sampling, overhead, cached_request_body)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _measure_cycle(request, cycle: RequestCycle, config: Config):
+        """
+        Time the call to the view, collecting its execution log and, if enabled, its database queries
+        """
+        cycle.start_time = datetime.now(timezone.utc)
+        start_ns = time.perf_counter_ns()
+        with (
+            execution_log_scope() as execution_log,
+            track_queries() if config.db_queries else contextlib.nullcontext() as query_stats,
+        ):
+            yield
+        cycle.duration = (time.perf_counter_ns() - start_ns) / 1e9
+        cycle.query_stats = query_stats
+        if execution_log and not hasattr(request, "execution_log_info"):
+            request.execution_log_info = execution_log.to_dict()
+
+    def _finish_cycle(
+        self, request, response, route: RouteRule, cycle: RequestCycle, config: Config
+    ) -> Optional[tuple]:
+        """
+        Report the request duration, then apply the tail sampling and the level policy:
+        return the arguments of _log_info, or None if nothing has to be logged
+        """
+        self._record_timing(request, response, cycle.duration, config)
+        sampling = cycle.sampling.tail(response.status_code, cycle.duration, config)
+        if not route.emit_record or not sampling.keep:
+            return None
+        level = self._get_log_level(response, cycle.duration, config)
+        if not log.isEnabledFor(level):
+            return None
+        return (
+            request,
+            response,
+            cycle.cached_request_body,
+            cycle.start_time,
+            cycle.duration,
+            level,
+            route,
+            sampling,
+            cycle.query_stats,
+            cycle.overhead,
+            config,
+        )
+
+    def _record_timing(self, request, response, duration: float, config: Config):
+        """
+        Report the request duration outside of the execution log: Server-Timing header and latency metrics
+        """
+        if config.server_timing:
+            self._add_server_timing_header(request, response, duration)
+        if config.metrics_enabled:
+            metrics_aggregator = self._metrics_aggregator or get_metrics_aggregator()
+            metrics_aggregator.record(self._get_view_name(request), response.status_code, duration)
+
+    @staticmethod
+    def _add_server_timing_header(request, response, duration: float):
+        """
+        Add a Server-Timing header with the total duration and the timing steps of ExecutionLogMixin, in milliseconds
+        """
+        metrics = {"total": duration}
+        with contextlib.suppress(AttributeError, KeyError):
+            metrics.update(request.execution_log_info["timing_steps"])
+        server_timing = ", ".join(
+            f"{SERVER_TIMING_INVALID_NAME_CHARS.sub('_', name)};dur={seconds * 1000:.3f}"
+            for name, seconds in metrics.items()
+        )
+        if existing_server_timing := response.headers.get("Server-Timing"):
+            server_timing = f"{existing_server_timing}, {server_timing}"
+        response.headers["Server-Timing"] = server_timing
+
+    def _log_info(
+        self,
+        request,
+        response,
+        cached_request_body,
+        start_time: datetime,
+        duration: float,
+        level: int,
+        route: RouteRule = DEFAULT_ROUTE_RULE,
+        sampling: Optional[SamplingDecision] = None,
+        query_stats: Optional[QueryStats] = None,
+        overhead: Optional[OverheadTimer] = None,
+        config: Optional[Config] = None,
+        *,
+        user: Optional[str] = None,
+    ):
+        """
+        Build the execution log data for a request/response cycle and emit it.
+        Lazy sections and queued records are evaluated after the request finished, possibly in another thread:
+        they must only read plain data, never request-bound state (e.g. request.user, resolved beforehand)
+        """
+        config = config or self._get_config()
+        key_paths = config.hashed_key_paths if self._should_apply_hash_filter(response.status_code, config) else ()
+        sections: dict[str, Any] = {
+            "request": self._lazy_section(
+                lambda: self._get_request_info(request, cached_request_body, overhead, config, user),
+                key_paths,
+                mask=True,
+                overhead=overhead,
+                config=config,
+            ),
+            "response": self._get_response_section(response, key_paths, route, overhead, config),
+            "execution": self._lazy_section(
+                lambda: self._get_execution_fields(request, start_time, duration, sampling, query_stats, config),
+                key_paths,
+                overhead=overhead,
+                config=config,
+            ),
+            "info": self._lazy_section(
+                lambda: self._get_info_fields(config), key_paths, overhead=overhead, config=config
+            ),
+        }
+        with contextlib.suppress(AttributeError):
+            sections.update(request.execution_log_info)
+        if overhead is not None:
+            sections["logger_overhead"] = overhead.phases
+        record = ExecutionLogRecord(sections)
+        self._emit(record if config.lazy_record else record.to_dict(), level, overhead, config)
+
+    def _get_response_section(
+        self,
+        response,
+        key_paths,
+        route: RouteRule = DEFAULT_ROUTE_RULE,
+        overhead: Optional[OverheadTimer] = None,
+        config: Optional[Config] = None,
+    ) -> LazySection:
+        """
+        Response section of the execution log. If the response data has to be hashed and
+        API_LOGGER_HASH_RESPONSE_CONTENT is enabled, the rendered content bytes are hashed directly,
+        instead of parsing them or hashing a serialization of response.data
+        """
+        config = config or self._get_config()
+        if not route.capture_response_body:
+            return self._lazy_section(
+                lambda: {"response": self._get_response_metadata(response, "Body not captured")}, (), config=config
+            )
+        response_data_path = ("response", "data")
+        if config.hash_response_content and response_data_path in map(tuple, key_paths):
+            key_paths = [key_path for key_path in key_paths if tuple(key_path) != response_data_path]
+            return self._lazy_section(
+                lambda: self._get_response_info(response, hash_content=True, overhead=overhead, config=config),
+                key_paths,
+                overhead=overhead,
+                config=config,
+            )
+        return self._lazy_section(
+            lambda: self._get_response_info(response, overhead=overhead, config=config),
+            key_paths,
+            overhead=overhead,
+            config=config,
+        )
+
+    @staticmethod
+    def _lazy_section(
+        get_fields: Callable[[], dict],
+        key_paths,
+        mask: bool = False,
+        overhead: Optional[OverheadTimer] = None,
+        config: Optional[Config] = None,
+    ) -> LazySection:
+        """
+        Wrap a fields getter into a section evaluated on first access, redacting it in a single pass:
+        values at the key paths are hashed and, if required, sensitive keys are masked
+        """
+
+        def build_section() -> dict:
+            fields = get_fields()
+            with time_phase(overhead, "redaction"):
+                fields = redact(fields, key_paths=key_paths, mask=mask, config=config)
+            (section,) = fields.values()
+            return section
+
+        return LazySection(build_section)
+
+    def _emit(
+        self, data: Mapping, level: int, overhead: Optional[OverheadTimer] = None, config: Optional[Config] = None
+    ):
+        """
+        Emit the execution log, either inline or through the background queue if enabled
+        """
+        start_ns = time.perf_counter_ns()
+        if (config or self._get_config()).queue_enabled:
+            (self._queue_emitter or get_queue_emitter()).emit(log, level, "Execution Log", data)
+        else:
+            log.log(level, "Execution Log", extra=data)
+        if overhead is not None:
+            OverheadTimer.previous_emission = (time.perf_counter_ns() - start_ns) / 1e9
+
+    def _should_apply_hash_filter(self, status_code, config: Optional[Config] = None) -> bool:
         if status_code is None:
             return True
         try:
@@ -62,27 +407,33 @@ class RESTRequestLoggingMiddleware:
         except ValueError:
             return True
         if is_client_error(status_code):
-            return settings.API_LOGGER_HASH_RESPONSE_ERRORS
+            return (config or self._get_config()).hash_response_errors
         return True
 
-    def _get_request_info(self, request, cached_request_body) -> dict:
+    def _get_request_info(
+        self,
+        request,
+        cached_request_body,
+        overhead: Optional[OverheadTimer] = None,
+        config: Optional[Config] = None,
+        user: Optional[str] = None,
+    ) -> dict:
         """
-        Extracts info from a request (Django or DRF request object)
+        Extracts info from a request (Django or DRF request object), with its user already resolved by _get_user
         """
+        config = config or self._get_config()
         jwt_payload = None
-        headers = dict(request.headers.items())
-        if auth_headers := headers.get("Authorization"):
-            jwt_payload = self._get_jwt_payload(auth_headers)
-        try:
-            user = request.user
-        except AttributeError:
-            user = None
+        if auth_headers := request.META.get("HTTP_AUTHORIZATION"):
+            with time_phase(overhead, "jwt_decode"):
+                jwt_payload = self._get_jwt_payload(auth_headers, config)
+        with time_phase(overhead, "request_parsing"):
+            body = self._get_request_body(cached_request_body)
         return {
             "request": {
                 "url": request.get_full_path(),
                 "method": request.method,
-                "headers": headers,
-                "body": self._get_request_body(cached_request_body),
+                "headers": config.header_capture.capture(request.META),
+                "body": body,
                 "user": user,
                 "jwt_payload": jwt_payload,
             }
@@ -96,87 +447,159 @@ class RESTRequestLoggingMiddleware:
         parts = auth_headers.split()
         return "" if parts[0] not in ("Bearer", "JWT") else parts[1]
 
-    def _get_jwt_payload(self, auth_headers) -> dict:
+    def _get_jwt_payload(self, auth_headers, config: Optional[Config] = None) -> dict:
         """
-        Extracts JWT payload from the Authorization headers
+        Extracts JWT payload from the Authorization headers, through the JWT payload cache unless it is disabled
         """
         token = self._get_raw_token(auth_headers)
-        return decode_jwt_token_payload(token)
+        return get_jwt_token_payload(token, config or self._get_config(), self._jwt_payload_cache)
 
-    def _get_request_body(self, cached_request_body) -> dict:
+    @staticmethod
+    def _read_request_body(
+        request, route: RouteRule = DEFAULT_ROUTE_RULE, config: Optional[Config] = None
+    ) -> Union[bytes, dict, str]:
+        """
+        Read the request body to log before the view consumes the stream.
+        Bodies that are too large, whose content type is not parseable or that the route does not capture
+        are not read at all, a placeholder (or a truncation marker with the original size) is returned instead
+        """
+        try:
+            content_length: Optional[int] = int(request.META["CONTENT_LENGTH"])
+        except (KeyError, TypeError, ValueError):
+            content_length = None
+        content_type = getattr(request, "content_type", "")
+        if content_length == 0 or (content_length is None and not content_type):
+            return b""
+        if not route.capture_request_body:
+            return "Body not captured"
+        config = config or get_config()
+        if not match_media_type(content_type, config.request_body_content_types):
+            return "Not a JSON body"
+        max_body_size = config.max_body_size
+        if max_body_size is not None and content_length is not None and content_length > max_body_size:
+            return {"_truncated": True, "size": content_length}
+        body = request.body
+        if max_body_size is not None and len(body) > max_body_size:
+            return {"_truncated": True, "size": len(body)}
+        return body
+
+    def _get_request_body(self, cached_request_body) -> Union[dict, list, str]:
         """
         Try to get the body of the request, if any
         """
         if not cached_request_body:
             return {}
+        if not isinstance(cached_request_body, bytes):
+            return cached_request_body
         try:
             body = json.loads(cached_request_body)
-            mask_sensitive_data(body)
         except Exception:
             body = {"info": "Could not read body"}
 
         return body
 
-    def _get_response_info(self, response) -> dict:
+    def _get_response_info(
+        self,
+        response,
+        hash_content: bool = False,
+        overhead: Optional[OverheadTimer] = None,
+        config: Optional[Config] = None,
+    ) -> dict:
         """
         Extracts info from a response (DRF response object)
         """
-        return {
-            "response": {
-                "data": self._get_response_data(response) or "Not a serializable response",
-                "status_code": response.status_code,
-            }
-        }
+        parser = self._get_response_parser(response)
+        if parser is None:
+            return {"response": self._get_response_metadata(response)}
+        if hash_content and response.content:
+            with time_phase(overhead, "hashing"):
+                content_hash = hash_bytes(response.content, config)
+            return {"response": {"data": content_hash, "status_code": response.status_code}}
+        with time_phase(overhead, "response_parsing"):
+            data = self._get_response_data(response, parser, config or self._get_config())
+        return {"response": {"data": data or "Not a serializable response", "status_code": response.status_code}}
 
     @staticmethod
-    def _get_response_data(response) -> dict:
-        """
-        Try to get response data
-        """
-        response_content_type = response.headers.get("Content-Type")
-        if response_content_type == "application/json":
-            try:
-                return response.data
-            except AttributeError:
-                return {}
-        if response_content_type == "application/pdf":
-            return {"content": "PDF bytes response"}
-        try:
-            return json.loads(response.content)
-        except (UnicodeDecodeError, JSONDecodeError):
-            return {}
+    def _get_response_parser(response) -> Optional[ResponseParser]:
+        """
+        Only non-streaming responses with a content type registered in restlogger.parsers are worth reading:
+        streaming responses would be consumed, other binary or text contents are only described by their metadata
+        """
+        if response.streaming:
+            return None
+        return response_parsers.get_parser(response.headers.get("Content-Type", ""))
 
     @staticmethod
-    def _timing_fields(start_time: datetime, end_time: datetime) -> dict:
+    def _get_response_data(response, parser: ResponseParser, config: Config):
         """
-        Create timing fields, calculating duration based on start and end times
+        Try to get response data, with the parser registered for its content type
+        """
+        return parser.parse(response, config.max_response_size)
+
+    @staticmethod
+    def _get_response_metadata(response, placeholder: Optional[str] = None) -> dict:
+        """
+        Describe a response without reading its content
+        """
+        content_length = response.headers.get("Content-Length")
+        if content_length is not None:
+            with contextlib.suppress(ValueError):
+                content_length = int(content_length)
+        elif not response.streaming:
+            content_length = len(response.content)
+        return {
+            "data": placeholder or ("Streaming response" if response.streaming else "Not a serializable response"),
+            "status_code": response.status_code,
+            "content_type": response.headers.get("Content-Type"),
+            "content_length": content_length,
+        }
+
+    @staticmethod
+    def _timing_fields(start_time: datetime, duration: float) -> dict:
+        """
+        Create timing fields: the duration is measured with a monotonic clock, wall-clock times are for display
         """
-        duration = end_time - start_time
         return {
             "timing": {
                 "start": start_time,
-                "end": end_time,
-                "duration": duration.total_seconds(),
+                "end": start_time + timedelta(seconds=duration),
+                "duration": duration,
             }
         }
 
-    def _get_execution_fields(self, request, start_time: datetime, finish_time: datetime) -> dict:
+    def _get_execution_fields(
+        self,
+        request,
+        start_time: datetime,
+        duration: float,
+        sampling: Optional[SamplingDecision] = None,
+        query_stats: Optional[QueryStats] = None,
+        config: Optional[Config] = None,
+    ) -> dict:
         """
         Create execution fields
         """
+        execution: dict[str, Any] = {
+            "app": (config or self._get_config()).app_name,
+            "name": self._get_view_name(request),
+        }
+        execution.update(self._timing_fields(start_time, duration))
+        if sampling is not None and sampling.rate < 1:
+            execution["sampling"] = sampling.to_dict()
+        if query_stats is not None:
+            execution["db"] = query_stats.to_dict()
+        return {"execution": execution}
+
+    @staticmethod
+    def _get_view_name(request) -> str:
         try:
-            name = request.resolver_match.view_name
+            return request.resolver_match.view_name
         except AttributeError:
-            name = ""
-        execution = {"app": settings.API_LOGGER_APP_NAME, "name": name}
-        execution.update(self._timing_fields(start_time, finish_time))
-        return {"execution": execution}
+            return ""
 
     @staticmethod
-    def _get_info_fields() -> dict:
+    def _get_info_fields(config: Optional[Config] = None) -> dict:
         """
-        Create info fields
+        Create info fields, from the ones precomputed by the configuration
         """
-        info = {"git_sha": getattr(settings, "GIT_SHA", ""), "git_tag": getattr(settings, "GIT_TAG", "")}
-        cleaned_info = {key: value for key, value in info.items() if value}
-        return {"info": cleaned_info}
+        return {"info": dict((config or get_config()).info)}
@@ -1,37 +1,7 @@
-import datetime
-from dataclasses import asdict, dataclass, field
 from typing import Optional
 
-from django.utils import timezone
-
-
-@dataclass
-class LogStep:
-    """DataClass to represent a single Log Step"""
-
-    msg: str
-    detail: dict = field(default_factory=dict)
-
-    def __str__(self):
-        return self.msg
-
-
-@dataclass
-class TimingStep:
-    """DataClass to represent a single Timing Step"""
-
-    start: Optional[datetime.datetime] = None
-    end: Optional[datetime.datetime] = None
-
-    def __post_init__(self):
-        self.start = timezone.now()
-
-    @property
-    def total(self) -> datetime.timedelta:
-        if self.end is not None:
-            return self.end - self.start  # type: ignore
-        else:
-            return datetime.timedelta(0)
+from .context import ExecutionLog, LogStep, TimingStep, execution_log_scope
+from .context import timing_step  # noqa: F401 (decorator for the methods of ExecutionLogMixin views)
 
 
 class ExecutionLogMixin:
@@ -40,63 +10,81 @@ class ExecutionLogMixin:
     It must be placed as the first mixin in the chain, as it overrides the dispatch() method,
     leveraging the MRO.
 
+    It is an adapter over the ExecutionLog of the current request (see restlogger.context): during dispatch(),
+    its methods write to the same ExecutionLog as the module level functions of restlogger.context
+
     Example:
 
         class MyView(ExecutionLogMixin, GenericAPIView):
-            ...
+            @timing_step("get")
+            def get(self, request, *args, **kwargs):
+                ...
 
     """
 
-    task_info: dict
-    log_steps: list[LogStep]
-    timing_steps: dict[str, TimingStep]
+    execution_log: ExecutionLog
 
     def __init__(self):
-        self.task_info = {}
-        self.log_steps = []
-        self.timing_steps = {}
+        self.execution_log = ExecutionLog()
+
+    @property
+    def task_info(self) -> dict:
+        return self.execution_log.task_info
+
+    @property
+    def log_steps(self) -> list[LogStep]:
+        return self.execution_log.log_steps
+
+    @property
+    def timing_steps(self) -> dict[str, TimingStep]:
+        return self.execution_log.timing_steps
 
     def add_task_info(self, task_info: dict):
-        """Update the task_info class attribute with the given data"""
-        self.task_info.update(task_info)
+        """Update the task_info with the given data"""
+        self.execution_log.add_task_info(task_info)
 
     def add_log_step(self, msg: str, detail: Optional[dict] = None):
-        """Append a LogStep to the log_steps class attribute"""
-        if not detail:
-            detail = {}
-        self.log_steps.append(LogStep(msg, detail))
+        """Append a LogStep to the log_steps"""
+        self.execution_log.add_log_step(msg, detail)
 
     def get_log_steps(self) -> list:
-        """Return a list of serialized LogSteps stored in the log_steps class attribute"""
-        return [asdict(step) for step in self.log_steps]
+        """Return a list of serialized LogSteps"""
+        return self.execution_log.get_log_steps()
 
     def start_timing_step(self, name: str):
-        """Starts a timing step with the given name"""
-        self.timing_steps[name] = TimingStep()
+        """Starts a timing step with the given name, accumulating into it if it was already timed"""
+        self.execution_log.start_timing_step(name)
 
     def stop_timing_step(self, name: str):
         """Stops a timing step with the given name, if any"""
-        if timing_step := self.timing_steps.get(name):
-            timing_step.end = timezone.now()
+        self.execution_log.stop_timing_step(name)
+
+    def timing_step(self, name: str):
+        """Context manager timing its block as the timing step with the given name"""
+        return self.execution_log.timing_step(name)
 
     def get_timing_steps(self) -> dict:
-        """Returns all TimingSteps stored in the timing_steps class attribute, except the null ones"""
-        return {
-            name: timing_step.total.total_seconds()
-            for name, timing_step in self.timing_steps.items()
-            if timing_step.total
-        }
+        """Returns all TimingSteps durations, except the null ones"""
+        return self.execution_log.get_timing_steps()
+
+    def get_timing_step_counts(self) -> dict:
+        """Returns how many times each TimingStep was timed, for the steps timed more than once"""
+        return self.execution_log.get_timing_step_counts()
 
     def get_execution_log_info(self) -> dict:
-        """Returns an object with task_info, log_steps and timing_steps stored in class attributes"""
-        return {
-            "task_info": self.task_info,
-            "log_steps": self.get_log_steps(),
-            "timing_steps": self.get_timing_steps(),
-        }
+        """Returns an object with task_info, log_steps and timing_steps"""
+        return self.execution_log.to_dict()
 
     def dispatch(self, request, *args, **kwargs):
-        """Calls the parent dispatch(), and appends execution_log_info to the request"""
-        response = super().dispatch(request, *args, **kwargs)
+        """
+        Calls the parent dispatch() within the ExecutionLog of the request (opening one if the middleware
+        did not), and appends execution_log_info to the request
+        """
+        with execution_log_scope() as execution_log:
+            execution_log.add_task_info(self.execution_log.task_info)
+            execution_log.log_steps.extend(self.execution_log.log_steps)
+            execution_log.timing_steps.update(self.execution_log.timing_steps)
+            self.execution_log = execution_log
+            response = super().dispatch(request, *args, **kwargs)
         request.execution_log_info = self.get_execution_log_info()
         return response
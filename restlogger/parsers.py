@@ -0,0 +1,140 @@
+import functools
+import json
+from dataclasses import dataclass
+from json import JSONDecodeError
+from typing import Any, Callable, Iterable, Optional, Union
+
+from .utils import match_media_type
+
+MEDIA_TYPE_CACHE_SIZE = 256
+
+
+def get_content_length(response) -> int:
+    """
+    Size of the content of a non-streaming response, from its Content-Length header when it is valid
+    """
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return len(response.content)
+
+
+def get_media_type_specificity(pattern: str) -> int:
+    """
+    Rank a media type pattern: exact media types first, then "type/*+suffix", "type/*" and "*/*"
+    """
+    if pattern == "*/*":
+        return 0
+    sub_type = pattern.partition("/")[2]
+    if sub_type == "*":
+        return 1
+    if sub_type.startswith("*+"):
+        return 2
+    return 3
+
+
+@dataclass(frozen=True)
+class ResponseParser:
+    """
+    DataClass to represent how the data of a response is extracted, for a set of media types.
+    With reuse_data, the data already parsed by DRF (response.data) is logged as it is.
+    Otherwise the extractor is called, unless it reads the content and the content is larger than max_size
+    (API_LOGGER_MAX_RESPONSE_SIZE if None): a truncation marker with the content size is logged instead
+    """
+
+    extract: Callable[[Any], Any]
+    max_size: Optional[int] = None
+    reuse_data: bool = False
+    reads_content: bool = True
+
+    def parse(self, response, default_max_size: Optional[int] = None):
+        if self.reuse_data and (data := getattr(response, "data", None)) is not None:
+            return data
+        max_size = self.max_size if self.max_size is not None else default_max_size
+        if self.reads_content and max_size is not None and (size := get_content_length(response)) > max_size:
+            return {"_truncated": True, "size": size}
+        return self.extract(response)
+
+
+class ResponseParserRegistry:
+    """
+    Maps media types (exact ones, or wildcards like "image/*", "application/*+json" or "*/*") to ResponseParsers.
+    The most specific pattern matching a content type wins, and the parser of each content type is memoized
+    """
+
+    def __init__(self) -> None:
+        self._parsers: dict[str, ResponseParser] = {}
+        self.get_parser = functools.lru_cache(maxsize=MEDIA_TYPE_CACHE_SIZE)(self._get_parser)
+
+    def register(
+        self,
+        media_types: Union[str, Iterable[str]],
+        extract: Optional[Callable[[Any], Any]] = None,
+        max_size: Optional[int] = None,
+        reuse_data: bool = False,
+        reads_content: bool = True,
+    ):
+        """
+        Register an extractor for the given media types, replacing any previous one.
+        Without extract, return a decorator registering the decorated function
+
+        Example:
+
+            @register_response_parser("application/x-ndjson", max_size=16 * 1024)
+            def extract_ndjson(response):
+                return [json.loads(line) for line in response.content.splitlines()]
+        """
+        if extract is None:
+            return lambda function: self.register(media_types, function, max_size, reuse_data, reads_content)
+        if isinstance(media_types, str):
+            media_types = (media_types,)
+        parser = ResponseParser(extract, max_size=max_size, reuse_data=reuse_data, reads_content=reads_content)
+        for media_type in media_types:
+            self._parsers[media_type.lower()] = parser
+        self.get_parser.cache_clear()
+        return extract
+
+    def unregister(self, media_types: Union[str, Iterable[str]]):
+        if isinstance(media_types, str):
+            media_types = (media_types,)
+        for media_type in media_types:
+            self._parsers.pop(media_type.lower(), None)
+        self.get_parser.cache_clear()
+
+    def _get_parser(self, content_type: str) -> Optional[ResponseParser]:
+        """Return the parser for the given content type, or None if its content must not be parsed"""
+        patterns = sorted(
+            (pattern for pattern in self._parsers if match_media_type(content_type, (pattern,))),
+            key=get_media_type_specificity,
+            reverse=True,
+        )
+        return self._parsers[patterns[0]] if patterns else None
+
+
+def extract_json(response):
+    try:
+        return json.loads(response.content)
+    except (UnicodeDecodeError, JSONDecodeError):
+        return {}
+
+
+def extract_pdf(response):
+    return {"content": "PDF bytes response"}
+
+
+response_parsers = ResponseParserRegistry()
+response_parsers.register(("application/json", "application/*+json"), extract_json, reuse_data=True)
+response_parsers.register("application/pdf", extract_pdf, reads_content=False)
+
+
+def register_response_parser(
+    media_types: Union[str, Iterable[str]],
+    extract: Optional[Callable[[Any], Any]] = None,
+    max_size: Optional[int] = None,
+    reuse_data: bool = False,
+    reads_content: bool = True,
+):
+    """
+    Register an extractor of response data for the given media types, see ResponseParserRegistry.register
+    """
+    return response_parsers.register(media_types, extract, max_size, reuse_data, reads_content)
@@ -0,0 +1,106 @@
+import contextlib
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, ContextManager, Iterator, Optional
+
+
+class LazySection(Mapping):
+    """
+    Read-only mapping whose content is built by the given factory on first access, then cached.
+    Used for the sections of an execution log, so that parsing, masking and hashing are only paid
+    for the sections a handler actually renders.
+    """
+
+    __slots__ = ("_factory", "_data")
+
+    def __init__(self, factory: Callable[[], dict]):
+        self._factory: Optional[Callable[[], dict]] = factory
+        self._data: Optional[dict] = None
+
+    @property
+    def data(self) -> dict:
+        """The section content, computed on first access"""
+        if self._factory is not None:
+            self._data = self._factory()
+            self._factory = None
+        return self._data  # type: ignore
+
+    @property
+    def evaluated(self) -> bool:
+        return self._factory is None
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return repr(self.data)
+
+
+class ExecutionLogRecord(Mapping):
+    """
+    Execution log passed as `extra` to the logger: each section becomes an attribute of the LogRecord.
+    Lazy sections are not evaluated when the LogRecord is created, only when a filter, handler or
+    formatter reads them.
+    """
+
+    __slots__ = ("_sections",)
+
+    def __init__(self, sections: dict[str, Any]):
+        self._sections = sections
+
+    def __getitem__(self, key):
+        return self._sections[key]
+
+    def __iter__(self):
+        return iter(self._sections)
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._sections!r})"
+
+    def to_dict(self) -> dict:
+        """Evaluate every section and return the whole execution log as plain dicts"""
+        return {
+            name: section.data if isinstance(section, LazySection) else section
+            for name, section in self._sections.items()
+        }
+
+
+class OverheadTimer:
+    """
+    Accumulates the time the logger itself spends in each phase of building an execution log (body copy,
+    parsing, JWT decode, redaction...), in seconds. The phases are filled while the sections are evaluated,
+    so the same dict is shared by the record and keeps growing until every section has been evaluated.
+    The emission of a record can't be measured in the record itself: the duration of the previous emission
+    of the process is reported instead
+    """
+
+    __slots__ = ("phases",)
+
+    previous_emission: Optional[float] = None
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+        if self.previous_emission is not None:
+            self.phases["previous_emission"] = self.previous_emission
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter_ns() - start_ns) / 1e9
+
+
+def time_phase(overhead: Optional[OverheadTimer], name: str) -> ContextManager:
+    """Time the block as the given phase, if the logger overhead is measured"""
+    return overhead.phase(name) if overhead is not None else contextlib.nullcontext()
@@ -0,0 +1,109 @@
+import dataclasses
+import functools
+import re
+from dataclasses import dataclass
+from typing import Iterable, Mapping, Optional
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .conf import get_config
+
+ROUTE_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class RouteRule:
+    """DataClass to represent the logging options that apply to a request path"""
+
+    enabled: bool = True
+    capture_request_body: bool = True
+    capture_response_body: bool = True
+    sample_rate: Optional[float] = None
+    emit_record: bool = True
+
+
+DEFAULT_ROUTE_RULE = RouteRule()
+
+
+class _TrieNode:
+    __slots__ = ("children", "excluded", "included", "overrides")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.excluded = False
+        self.included = False
+        self.overrides: dict = {}
+
+
+class PathRouter:
+    """
+    Decides whether and how a request path is logged.
+    Prefixes to exclude, to include and per-prefix rules are compiled into a character trie, so that a lookup
+    walks the path once regardless of the number of rules; longer prefixes override shorter ones, then regex
+    rules are applied in order. Lookups are memoized in a bounded LRU cache
+    """
+
+    def __init__(
+        self,
+        exclude: Iterable[str] = (),
+        include: Iterable[str] = (),
+        rules: Optional[Mapping[str, dict]] = None,
+        regex_rules: Optional[Mapping[str, dict]] = None,
+        cache_size: int = ROUTE_CACHE_SIZE,
+    ):
+        self._root = _TrieNode()
+        self._has_include = False
+        for prefix in exclude:
+            self._get_node(prefix).excluded = True
+        for prefix in include:
+            self._get_node(prefix).included = True
+            self._has_include = True
+        for prefix, overrides in (rules or {}).items():
+            self._get_node(prefix).overrides.update(self._check_overrides(overrides))
+        self._regex_rules = [
+            (re.compile(pattern), self._check_overrides(overrides))
+            for pattern, overrides in (regex_rules or {}).items()
+        ]
+        self.match = functools.lru_cache(maxsize=cache_size)(self._match)
+
+    def _get_node(self, prefix: str) -> _TrieNode:
+        node = self._root
+        for char in prefix:
+            node = node.children.setdefault(char, _TrieNode())
+        return node
+
+    @staticmethod
+    def _check_overrides(overrides: dict) -> dict:
+        fields = {field.name for field in dataclasses.fields(RouteRule)}
+        if unknown_fields := set(overrides) - fields:
+            raise ImproperlyConfigured(f"Unknown restlogger route options: {', '.join(sorted(unknown_fields))}")
+        return overrides
+
+    def _match(self, path: str) -> Optional[RouteRule]:
+        """
+        Return the RouteRule for the given path, or None if the path must not be logged
+        """
+        node = self._root
+        included = False
+        overrides: dict = {}
+        for index in range(len(path) + 1):
+            if node.excluded:
+                return None
+            included = included or node.included
+            overrides.update(node.overrides)
+            if index == len(path) or (child := node.children.get(path[index])) is None:
+                break
+            node = child
+        if self._has_include and not included:
+            return None
+        for pattern, regex_overrides in self._regex_rules:
+            if pattern.search(path):
+                overrides.update(regex_overrides)
+        return dataclasses.replace(DEFAULT_ROUTE_RULE, **overrides) if overrides else DEFAULT_ROUTE_RULE
+
+
+def get_path_router() -> PathRouter:
+    """
+    Return the PathRouter compiled by the configuration, rebuilt when the settings change
+    """
+    return get_config().path_router
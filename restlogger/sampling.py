@@ -0,0 +1,65 @@
+import random
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from rest_framework.status import is_client_error, is_server_error
+
+from .conf import Config, get_config
+from .routing import RouteRule
+
+
+@dataclass(frozen=True)
+class SamplingDecision:
+    """
+    DataClass to represent the sampling decision for a request: the head decision is taken before collecting
+    anything, tail rules can still keep an unsampled request once its response and duration are known
+    """
+
+    rate: float = 1.0
+    head_sampled: bool = True
+    tail_reason: Optional[str] = None
+
+    @classmethod
+    def head(cls, route: RouteRule, config: Optional[Config] = None) -> "SamplingDecision":
+        """Take the head sampling decision with the rate of the route, or the default one"""
+        rate = route.sample_rate if route.sample_rate is not None else (config or get_config()).sample_rate
+        return cls(rate=rate, head_sampled=rate >= 1 or random.random() < rate)
+
+    def tail(self, status_code: int, duration: float, config: Optional[Config] = None) -> "SamplingDecision":
+        """Apply the tail rules, which always keep errors and slow requests"""
+        if self.rate >= 1:
+            return self
+        return replace(self, tail_reason=get_tail_sampling_reason(status_code, duration, config))
+
+    @property
+    def keep(self) -> bool:
+        return self.head_sampled or self.tail_reason is not None
+
+    @property
+    def weight(self) -> float:
+        """How many requests a kept record stands for, to re-weight downstream aggregates"""
+        if self.tail_reason is not None or self.rate >= 1:
+            return 1.0
+        return 1 / self.rate
+
+    def to_dict(self) -> dict:
+        sampling = {"rate": self.rate, "decision": "head" if self.tail_reason is None else "tail"}
+        if self.tail_reason is not None:
+            sampling["reason"] = self.tail_reason
+        sampling["weight"] = self.weight
+        return sampling
+
+
+def get_tail_sampling_reason(status_code: int, duration: float, config: Optional[Config] = None) -> Optional[str]:
+    """
+    Return why a request must be kept regardless of the head sampling decision, if it must
+    """
+    config = config or get_config()
+    if is_server_error(status_code) and config.sample_keep_server_errors:
+        return "server_error"
+    if is_client_error(status_code) and config.sample_keep_client_errors:
+        return "client_error"
+    slow_request_threshold = config.slow_request_threshold
+    if slow_request_threshold is not None and duration >= slow_request_threshold:
+        return "slow"
+    return None
@@ -0,0 +1,170 @@
+import contextlib
+import functools
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from .conf import Config, get_config
+from .context import ExecutionLog, execution_log_scope
+from .emitters import get_queue_emitter
+from .middleware import RESTRequestLoggingMiddleware
+from .utils import redact
+
+log = logging.getLogger("restlogger")
+
+
+class TaskRun:
+    """
+    A run of a background task, from its start to the emission of its execution log.
+    The record has the same schema as the one of RESTRequestLoggingMiddleware, with a "task" section
+    (name, masked args and kwargs, status, result or exception) in place of the request/response ones.
+    While the task runs, the functions of restlogger.context write to its own ExecutionLog
+    """
+
+    def __init__(
+        self,
+        name: str,
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+        task_id: Optional[str] = None,
+        log_args: bool = True,
+        log_result: bool = True,
+    ):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.task_id = task_id
+        self.log_args = log_args
+        self.log_result = log_result
+        self.execution_log: Optional[ExecutionLog] = None
+        self._exit_stack = contextlib.ExitStack()
+
+    def start(self):
+        self.start_time = datetime.now(timezone.utc)
+        self.start_ns = time.perf_counter_ns()
+        self.execution_log = self._exit_stack.enter_context(execution_log_scope(reuse=False))
+
+    def finish(self, result=None, exception: Optional[BaseException] = None):
+        """Close the ExecutionLog of the task and emit its execution log"""
+        duration = (time.perf_counter_ns() - self.start_ns) / 1e9
+        self._exit_stack.close()
+        config = get_config()
+        if not config.enabled:
+            return
+        level = self._get_log_level(exception, duration, config)
+        if log.isEnabledFor(level):
+            self._emit(self.get_sections(result, exception, duration, config), level, config)
+
+    @staticmethod
+    def _get_log_level(exception: Optional[BaseException], duration: float, config: Config) -> int:
+        levels: list[Optional[int]] = [config.default_log_level]
+        if exception is not None:
+            levels.append(config.server_error_log_level)
+        slow_request_threshold = config.slow_request_threshold
+        if slow_request_threshold is not None and duration >= slow_request_threshold:
+            levels.append(config.slow_request_log_level)
+        return max(level for level in levels if level is not None)
+
+    def get_sections(
+        self, result, exception: Optional[BaseException], duration: float, config: Optional[Config] = None
+    ) -> dict:
+        config = config or get_config()
+        key_paths = list(config.hashed_key_paths)
+        if config.hash_response_data:
+            key_paths.append(("task", "result"))
+        task: dict = {"name": self.name}
+        if self.task_id is not None:
+            task["id"] = self.task_id
+        if self.log_args:
+            task.update({"args": list(self.args), "kwargs": self.kwargs})
+        task["status"] = "failure" if exception is not None else "success"
+        if exception is not None:
+            task["exception"] = repr(exception)
+        elif self.log_result:
+            task["result"] = result
+        execution = {"app": config.app_name, "name": self.name}
+        execution.update(RESTRequestLoggingMiddleware._timing_fields(self.start_time, duration))
+        sections = {
+            "task": redact({"task": task}, key_paths=key_paths, config=config)["task"],
+            "execution": redact({"execution": execution}, key_paths=key_paths, mask=False, config=config)["execution"],
+            "info": RESTRequestLoggingMiddleware._get_info_fields(config)["info"],
+        }
+        if self.execution_log:
+            sections.update(self.execution_log.to_dict())
+        return sections
+
+    @staticmethod
+    def _emit(data: dict, level: int, config: Config):
+        if config.queue_enabled:
+            get_queue_emitter().emit(log, level, "Task Execution Log", data)
+        else:
+            log.log(level, "Task Execution Log", extra=data)
+
+
+def log_task(name: Optional[str] = None, log_args: bool = True, log_result: bool = True) -> Callable:
+    """
+    Decorator emitting an execution log for each call of a background task function.
+    It works with any task runner, and can be applied under Celery's @app.task decorator
+
+    Example:
+
+        @app.task
+        @log_task()
+        def send_newsletter(newsletter_id):
+            ...
+    """
+
+    def decorator(function: Callable) -> Callable:
+        task_name = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            task_run = TaskRun(task_name, args, kwargs, log_args=log_args, log_result=log_result)
+            task_run.start()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as exception:
+                task_run.finish(exception=exception)
+                raise
+            task_run.finish(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+_celery_task_runs: dict[str, TaskRun] = {}
+_celery_task_runs_lock = threading.Lock()
+
+
+def connect_celery_signals(log_args: bool = True, log_result: bool = True):
+    """
+    Emit an execution log for every Celery task run by this worker, through Celery signals,
+    instead of decorating each task with log_task
+    """
+    from celery import signals
+
+    def on_task_prerun(task_id, task, args=(), kwargs=None, **extra):
+        task_run = TaskRun(task.name, tuple(args or ()), kwargs, task_id, log_args, log_result)
+        with _celery_task_runs_lock:
+            _celery_task_runs[task_id] = task_run
+        task_run.start()
+
+    def on_task_failure(task_id, exception=None, **extra):
+        with _celery_task_runs_lock:
+            task_run = _celery_task_runs.pop(task_id, None)
+        if task_run is not None:
+            task_run.finish(exception=exception)
+
+    def on_task_postrun(task_id, retval=None, **extra):
+        with _celery_task_runs_lock:
+            task_run = _celery_task_runs.pop(task_id, None)
+        if task_run is not None:
+            task_run.finish(retval)
+
+    signals.task_prerun.connect(on_task_prerun, weak=False, dispatch_uid="restlogger_task_prerun")
+    signals.task_failure.connect(on_task_failure, weak=False, dispatch_uid="restlogger_task_failure")
+    signals.task_postrun.connect(on_task_postrun, weak=False, dispatch_uid="restlogger_task_postrun")
@@ -2,6 +2,7 @@ from unittest import mock
 
 import pytest
 import django
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
 from django.http import HttpResponse
 from pytest_django.lazy_django import skip_if_no_django
@@ -27,6 +28,9 @@ def pytest_configure():
         MIDDLEWARE=[
             "restlogger.middleware.RESTRequestLoggingMiddleware",
         ],
+        DATABASES={
+            "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+        },
         INSTALLED_APPS=[
             "django.contrib.auth",
             "django.contrib.contenttypes",
@@ -75,6 +79,26 @@ def get_pdf_api_response(request):
     return response.render()
 
 
+def as_async(get_response):
+    """Wrap a sync get_response callable into a coroutine function, as Django does under ASGI"""
+
+    async def async_get_response(request):
+        return await sync_to_async(get_response)(request)
+
+    return async_get_response
+
+
+def get_streaming_csv_response(request):
+    from django.http import StreamingHttpResponse
+
+    rows = (f"{index},value\n" for index in range(1000))
+    return StreamingHttpResponse(rows, content_type="text/csv")
+
+
+def get_image_response(request):
+    return HttpResponse(b"\x89PNG\r\n\x1a\n" + b"\x00" * 1024, content_type="image/png")
+
+
 @pytest.fixture()
 def middleware_empty_django_response():
     skip_if_no_django()
@@ -111,6 +135,43 @@ def middleware_pdf_api_response():
     yield RESTRequestLoggingMiddleware(get_pdf_api_response)
 
 
+@pytest.fixture()
+def middleware_streaming_csv_response():
+    skip_if_no_django()
+
+    from restlogger.middleware import RESTRequestLoggingMiddleware
+
+    yield RESTRequestLoggingMiddleware(get_streaming_csv_response)
+
+
+@pytest.fixture()
+def middleware_image_response():
+    skip_if_no_django()
+
+    from restlogger.middleware import RESTRequestLoggingMiddleware
+
+    yield RESTRequestLoggingMiddleware(get_image_response)
+
+
+@pytest.fixture(params=["sync", "async"])
+def run_middleware(request):
+    """
+    Build the middleware around the given get_response and run it on a request,
+    either through the sync code path or through the native async one
+    """
+    skip_if_no_django()
+
+    from restlogger.middleware import RESTRequestLoggingMiddleware
+
+    def run(get_response, http_request):
+        if request.param == "sync":
+            return RESTRequestLoggingMiddleware(get_response)(http_request)
+        middleware = RESTRequestLoggingMiddleware(as_async(get_response))
+        return async_to_sync(middleware)(http_request)
+
+    yield run
+
+
 @pytest.fixture()
 def api_request_factory():
     """APIRequestFactory instance"""
@@ -134,6 +195,8 @@ def standard_request_factory():
 @pytest.fixture
 def mocked_logger():
     with mock.patch.object(restlogger.middleware, "log") as mock_logger:
+        # level checks are kept out of mock_calls, which only records the emitted log
+        mock_logger.isEnabledFor = lambda level: True
         yield mock_logger
 
 
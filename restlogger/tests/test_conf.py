@@ -0,0 +1,87 @@
+import dataclasses
+import logging
+
+from django.conf import settings
+from django.test import override_settings
+
+from restlogger.conf import Config, get_config
+
+
+def test_config_defaults():
+    config = Config()
+    assert config.enabled
+    assert config.max_body_size == 64 * 1024
+    assert config.headers_to_redact == ("Authorization", "Proxy-Authorization", "Cookie")
+
+
+def test_config_built_directly_is_normalized():
+    config = Config(key_path_to_hash=[["path", "to", "hash"]], sensitive_keys=["token"], url_path_to_exclude=["/skip"])
+    assert config.key_path_to_hash == (("path", "to", "hash"),)
+    assert config.hashed_key_paths == (("path", "to", "hash"), ("response", "data"))
+    assert config.sensitive_keys == ("token", "password")
+    assert config.sensitive_key_matcher.is_sensitive("auth_token")
+    assert config.path_router.match("/skip/a") is None
+    assert dataclasses.replace(config, hash_response_data=False).hashed_key_paths == (("path", "to", "hash"),)
+
+
+@override_settings(
+    API_LOGGER_HASH_RESPONSE_DATA=True,
+    API_LOGGER_KEY_PATH_TO_HASH=(),
+    API_LOGGER_URL_PATH_TO_EXCLUDE=(),
+    API_LOGGER_APP_NAME="",
+    GIT_SHA="",
+    GIT_TAG="",
+)
+def test_config_built_directly_matches_the_defaults_from_settings():
+    assert Config() == Config.from_settings()
+
+
+@override_settings(
+    API_LOGGER_KEY_PATH_TO_HASH=[["path", "to", "hash"], ("response", "data")],
+    API_LOGGER_HASH_RESPONSE_DATA=True,
+    API_LOGGER_SENSITIVE_KEYS=["password", "token"],
+    API_LOGGER_URL_PATH_TO_EXCLUDE=["/health"],
+)
+def test_config_from_settings_is_normalized():
+    config = get_config()
+    assert config.hashed_key_paths == (("path", "to", "hash"), ("response", "data"))
+    assert config.sensitive_keys == ("password", "token")
+    assert config.url_path_to_exclude == ("/health",)
+    # the settings themselves are left untouched
+    assert settings.API_LOGGER_SENSITIVE_KEYS == ["password", "token"]
+    assert settings.API_LOGGER_KEY_PATH_TO_HASH == [["path", "to", "hash"], ("response", "data")]
+
+
+def test_config_adds_the_default_key_path_and_sensitive_key():
+    with override_settings(API_LOGGER_HASH_RESPONSE_DATA=True, API_LOGGER_SENSITIVE_KEYS=("token",)):
+        config = get_config()
+        assert config.hashed_key_paths == (("path", "to", "hash"), ("response", "data"))
+        assert config.sensitive_keys == ("token", "password")
+    assert get_config().hashed_key_paths == (("path", "to", "hash"),)
+    assert get_config().sensitive_keys == ("password",)
+
+
+def test_config_info(settings):
+    assert get_config().info == {"git_sha": "a-sha", "git_tag": "a-tag"}
+    settings.GIT_TAG = ""
+    assert get_config().info == {"git_sha": "a-sha"}
+    delattr(settings, "GIT_SHA")
+    assert Config.from_settings().info == {}
+
+
+def test_config_max_log_level():
+    assert get_config().max_log_level == logging.INFO
+    with override_settings(API_LOGGER_SERVER_ERROR_LOG_LEVEL=logging.ERROR):
+        assert get_config().max_log_level == logging.ERROR
+    with override_settings(API_LOGGER_SLOW_REQUEST_THRESHOLD=1):
+        assert get_config().max_log_level == logging.WARNING
+
+
+def test_get_config_is_rebuilt_when_settings_change():
+    config = get_config()
+    assert get_config() is config
+    with override_settings(API_LOGGER_APP_NAME="Other"):
+        assert get_config().app_name == "Other"
+    assert get_config().app_name == "Test"
+    with override_settings(UNRELATED_SETTING=True):
+        assert get_config().app_name == "Test"
@@ -0,0 +1,81 @@
+import pytest
+from django.http import HttpResponse
+
+from restlogger import context
+from restlogger.context import ExecutionLog, execution_log_scope, get_execution_log
+from restlogger.mixins import ExecutionLogMixin
+
+
+@context.timing_step("service")
+def service_call():
+    context.add_log_step("service-step", {"key": "value"})
+    context.add_task_info({"service": True})
+
+
+def get_response_with_service_call(request):
+    service_call()
+    return HttpResponse("A simple response")
+
+
+def test_functions_outside_execution_log_scope():
+    assert get_execution_log() is None
+    service_call()
+    with context.timing_step("step") as step:
+        assert step is None
+    context.start_timing_step("step")
+    context.stop_timing_step("step")
+
+
+def test_execution_log_scope():
+    with execution_log_scope() as execution_log:
+        assert get_execution_log() is execution_log
+        assert not execution_log
+        with execution_log_scope() as inner_execution_log:
+            assert inner_execution_log is execution_log
+        service_call()
+        context.start_timing_step("other")
+        context.stop_timing_step("other")
+    assert get_execution_log() is None
+    assert execution_log
+    assert execution_log.task_info == {"service": True}
+    assert execution_log.get_log_steps() == [{"msg": "service-step", "detail": {"key": "value"}}]
+    assert set(execution_log.get_timing_steps()) == {"service", "other"}
+
+
+def test_execution_log_to_dict():
+    assert ExecutionLog().to_dict() == {"task_info": {}, "log_steps": [], "timing_steps": {}}
+
+
+def test_middleware_execution_log_outside_views(standard_request_factory, run_middleware, mocked_logger):
+    run_middleware(get_response_with_service_call, standard_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["task_info"] == {"service": True}
+    assert kwargs["extra"]["log_steps"] == [{"msg": "service-step", "detail": {"key": "value"}}]
+    assert set(kwargs["extra"]["timing_steps"]) == {"service"}
+
+
+def test_middleware_without_execution_log(standard_request_factory, run_middleware, mocked_logger):
+    run_middleware(lambda request: HttpResponse("A simple response"), standard_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert "task_info" not in kwargs["extra"]
+
+
+@pytest.mark.freeze_time("2023-01-01", auto_tick_seconds=0.1)
+def test_middleware_execution_log_with_mixin(standard_request_factory, run_middleware, mocked_logger):
+    from django.views import View
+
+    class TestView(ExecutionLogMixin, View):
+        def get(self, request, *args, **kwargs):
+            self.add_log_step("view-step")
+            with self.timing_step("view"):
+                service_call()
+            return HttpResponse("A simple response")
+
+    run_middleware(TestView.as_view(), standard_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["task_info"] == {"service": True}
+    assert kwargs["extra"]["log_steps"] == [
+        {"msg": "view-step", "detail": {}},
+        {"msg": "service-step", "detail": {"key": "value"}},
+    ]
+    assert kwargs["extra"]["timing_steps"] == {"view": pytest.approx(0.3), "service": pytest.approx(0.1)}
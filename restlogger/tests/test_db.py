@@ -0,0 +1,72 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.http import JsonResponse
+from django.test import override_settings
+
+from restlogger.db import QueryStats, normalize_sql, record_query, track_queries
+
+
+def get_n_plus_one_response(request):
+    content_types = list(ContentType.objects.all()[:3])
+    for content_type in content_types:
+        ContentType.objects.filter(pk=content_type.pk).exists()
+    return JsonResponse({"count": len(content_types)})
+
+
+def test_normalize_sql():
+    assert normalize_sql('SELECT  "id"\nFROM "t" WHERE "id" = %s AND "name" = \'it\'\'s\'') == (
+        'SELECT "id" FROM "t" WHERE "id" = ? AND "name" = ?'
+    )
+    assert normalize_sql('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s) LIMIT 21') == (
+        'SELECT * FROM "t" WHERE "id" IN (...) LIMIT ?'
+    )
+
+
+def test_query_stats():
+    query_stats = QueryStats()
+    assert query_stats.to_dict() == {"count": 0, "duration": 0.0, "duplicates": 0, "slowest": None}
+    query_stats.add('SELECT * FROM "t" WHERE "id" = %s', 0.1)
+    query_stats.add('SELECT * FROM "t" WHERE "id" = %s', 0.3)
+    query_stats.add('SELECT * FROM "u"', 0.2)
+    assert query_stats.to_dict() == {
+        "count": 3,
+        "duration": pytest.approx(0.6),
+        "duplicates": 1,
+        "slowest": {"sql": 'SELECT * FROM "t" WHERE "id" = ?', "duration": 0.3},
+    }
+
+
+@pytest.mark.django_db
+def test_track_queries():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    with track_queries() as query_stats:
+        assert record_query in connection.execute_wrappers
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT %s", [1])
+            cursor.execute("SELECT %s", [2])
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 3")
+    assert query_stats.count == 2
+    assert query_stats.duplicates == 1
+    assert query_stats.to_dict()["slowest"]["sql"] == "SELECT ?"
+
+
+@pytest.mark.django_db
+def test_middleware_without_db_queries(api_request_factory, run_middleware, mocked_logger):
+    run_middleware(get_n_plus_one_response, api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert "db" not in kwargs["extra"]["execution"]
+
+
+@pytest.mark.django_db
+@override_settings(API_LOGGER_DB_QUERIES=True)
+def test_middleware_db_queries(api_request_factory, run_middleware, mocked_logger):
+    run_middleware(get_n_plus_one_response, api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    db = kwargs["extra"]["execution"]["db"]
+    assert db["count"] == 4
+    assert db["duplicates"] == 2
+    assert db["duration"] > 0
+    assert db["slowest"]["sql"].startswith("SELECT")
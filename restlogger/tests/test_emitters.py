@@ -0,0 +1,86 @@
+import logging
+import threading
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+
+from restlogger.emitters import DROP_NEWEST, DROP_OLDEST, QueueEmitter, get_queue_emitter
+
+
+@pytest.fixture
+def blocked_logger():
+    """A logger whose first emission blocks until released, to keep records in the queue"""
+    busy = threading.Event()
+    release = threading.Event()
+
+    def log(*args, **kwargs):
+        busy.set()
+        release.wait(5)
+
+    logger = mock.Mock()
+    logger.log.side_effect = log
+    yield logger, busy, release
+    release.set()
+
+
+def _emitted_numbers(logger):
+    return [kwargs["extra"]["n"] for name, args, kwargs in logger.log.mock_calls]
+
+
+def test_queue_emitter_emits_in_background():
+    logger = mock.Mock()
+    emitter = QueueEmitter(capacity=10)
+    emitter.emit(logger, logging.INFO, "Execution Log", {"n": 0})
+    assert emitter.flush(timeout=5)
+    logger.log.assert_called_once_with(logging.INFO, "Execution Log", extra={"n": 0})
+    assert emitter.stats() == {"queued": 0, "emitted": 1, "dropped": 0}
+    emitter.stop()
+
+
+@pytest.mark.parametrize(
+    "drop_policy, expected",
+    [
+        (DROP_NEWEST, [0, 1, 2]),
+        (DROP_OLDEST, [0, 3, 4]),
+    ],
+)
+def test_queue_emitter_drop_policy(blocked_logger, drop_policy, expected):
+    logger, busy, release = blocked_logger
+    emitter = QueueEmitter(capacity=2, drop_policy=drop_policy)
+    emitter.emit(logger, logging.INFO, "Execution Log", {"n": 0})
+    assert busy.wait(5)
+    for n in range(1, 5):
+        emitter.emit(logger, logging.INFO, "Execution Log", {"n": n})
+    release.set()
+    assert emitter.flush(timeout=5)
+    assert _emitted_numbers(logger) == expected
+    assert emitter.dropped == 2
+    emitter.stop()
+
+
+def test_queue_emitter_stop_flushes_queue(blocked_logger):
+    logger, busy, release = blocked_logger
+    emitter = QueueEmitter(capacity=10)
+    for n in range(3):
+        emitter.emit(logger, logging.INFO, "Execution Log", {"n": n})
+    assert busy.wait(5)
+    release.set()
+    emitter.stop()
+    assert _emitted_numbers(logger) == [0, 1, 2]
+
+
+def test_queue_emitter_invalid_drop_policy():
+    with pytest.raises(ValueError):
+        QueueEmitter(drop_policy="drop_random")
+
+
+@override_settings(API_LOGGER_QUEUE_ENABLED=True)
+def test_middleware_emits_through_queue(api_request_factory, middleware_empty_api_response, mocked_logger):
+    request = api_request_factory.get("/foo", format="json")
+    middleware_empty_api_response(request)
+    assert get_queue_emitter().flush(timeout=5)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert name == "log"
+    assert args == (logging.INFO, "Execution Log")
+    assert kwargs["extra"]["request"]["url"] == "/foo"
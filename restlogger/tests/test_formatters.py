@@ -0,0 +1,82 @@
+import datetime
+import json
+import logging
+import sys
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+
+from restlogger.formatters import ExecutionLogFormatter
+from restlogger.records import LazySection
+
+from .conftest import get_simple_api_response
+
+
+class User:
+    def __str__(self):
+        return "john"
+
+
+def make_record(**extra) -> logging.LogRecord:
+    record = logging.LogRecord("restlogger", logging.INFO, __file__, 1, "Execution Log", None, None)
+    record.created = 1672531200.5
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "json"])
+def formatter(request):
+    yield ExecutionLogFormatter(use_orjson=request.param)
+
+
+def test_format_record(formatter):
+    start = datetime.datetime(2023, 1, 1, 0, 0, 0, 250000, tzinfo=datetime.timezone.utc)
+    record = make_record(
+        request={"user": User(), "body": {1: "a"}},
+        response=LazySection(lambda: {"data": {"id": 1}, "status_code": 200}),
+        execution={"app": "Test", "timing": {"start": start, "duration": 0.25}},
+        info={"git_sha": "a-sha"},
+        other="ignored",
+    )
+    assert json.loads(formatter.format(record)) == {
+        "timestamp": "2023-01-01T00:00:00.500000+00:00",
+        "level": "INFO",
+        "logger": "restlogger",
+        "message": "Execution Log",
+        "request": {"user": "john", "body": {"1": "a"}},
+        "response": {"data": {"id": 1}, "status_code": 200},
+        "execution": {"app": "Test", "timing": {"start": "2023-01-01T00:00:00.250000+00:00", "duration": 0.25}},
+        "info": {"git_sha": "a-sha"},
+    }
+
+
+def test_format_static_sections_are_encoded_once(formatter):
+    with mock.patch.object(formatter, "dumps", wraps=formatter.dumps) as dumps:
+        assert formatter.format(make_record(info={"git_sha": "a-sha"})).endswith(',"info":{"git_sha":"a-sha"}}')
+        assert formatter.format(make_record(info={"git_sha": "a-sha"})).endswith(',"info":{"git_sha":"a-sha"}}')
+        assert dumps.call_count == 3
+        assert formatter.format(make_record(info={"git_sha": "b-sha"})).endswith(',"info":{"git_sha":"b-sha"}}')
+        assert dumps.call_count == 5
+
+
+def test_format_exception(formatter):
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record(exc_info=sys.exc_info())
+    assert "ValueError: boom" in json.loads(formatter.format(record))["exc_info"]
+
+
+def test_format_large_integer():
+    assert json.loads(ExecutionLogFormatter().format(make_record(request={"id": 2**70})))["request"] == {"id": 2**70}
+
+
+@override_settings(API_LOGGER_LAZY_RECORD=True)
+def test_format_middleware_record(api_request_factory, run_middleware, mocked_logger, formatter):
+    run_middleware(get_simple_api_response, api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    data = json.loads(formatter.format(make_record(**kwargs["extra"])))
+    assert data["response"]["data"] == {"content": "A simple API response"}
+    assert data["execution"]["app"] == "Test"
+    assert data["info"] == {"git_sha": "a-sha", "git_tag": "a-tag"}
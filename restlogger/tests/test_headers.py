@@ -0,0 +1,62 @@
+from django.test import override_settings
+
+from restlogger.conf import get_config
+from restlogger.headers import HeaderCapture, get_meta_key
+from restlogger.utils import FILTERED
+
+META = {
+    "HTTP_AUTHORIZATION": "Bearer token",
+    "HTTP_COOKIE": "sessionid=secret",
+    "HTTP_X_REQUEST_ID": "1234",
+    "HTTP_X_FORWARDED_FOR": "10.0.0.1, 10.0.0.2",
+    "CONTENT_TYPE": "application/json",
+    "REMOTE_ADDR": "127.0.0.1",
+    "wsgi.input": None,
+}
+
+
+def test_get_meta_key():
+    assert get_meta_key("X-Request-Id") == "HTTP_X_REQUEST_ID"
+    assert get_meta_key("content-type") == "CONTENT_TYPE"
+
+
+def test_header_capture_all_headers():
+    assert HeaderCapture().capture(META) == {
+        "Authorization": "Bearer token",
+        "Cookie": "sessionid=secret",
+        "X-Request-Id": "1234",
+        "X-Forwarded-For": "10.0.0.1, 10.0.0.2",
+        "Content-Type": "application/json",
+    }
+
+
+def test_header_capture_exclude_and_redact():
+    capture = HeaderCapture(exclude=("x-forwarded-for",), redact=("Authorization", "Cookie"))
+    assert capture.capture(META) == {
+        "Authorization": FILTERED,
+        "Cookie": FILTERED,
+        "X-Request-Id": "1234",
+        "Content-Type": "application/json",
+    }
+
+
+def test_header_capture_include():
+    capture = HeaderCapture(include=("X-Request-Id", "Authorization", "X-Missing", "Cookie"), exclude=("Cookie",))
+    assert capture.capture(META) == {"X-Request-Id": "1234", "Authorization": "Bearer token"}
+
+
+def test_header_capture_rebuilt_on_setting_changed():
+    assert get_config().header_capture.capture(META)["Authorization"] == FILTERED
+    with override_settings(API_LOGGER_HEADERS_TO_INCLUDE=("X-Request-Id",)):
+        assert get_config().header_capture.capture(META) == {"X-Request-Id": "1234"}
+    assert get_config().header_capture.capture(META)["Cookie"] == FILTERED
+
+
+def test_middleware_headers(api_request_factory, middleware_empty_api_response, mocked_logger):
+    token = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJ1c2VyX2lkIjoxfQ.e30"
+    request = api_request_factory.get("/foo", format="json", HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_TEST="1")
+    middleware_empty_api_response(request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["request"]["headers"]["Authorization"] == FILTERED
+    assert kwargs["extra"]["request"]["headers"]["X-Test"] == "1"
+    assert kwargs["extra"]["request"]["jwt_payload"] == {"user_id": 1}
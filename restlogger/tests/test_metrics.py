@@ -0,0 +1,101 @@
+import logging
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+
+from restlogger.metrics import LatencyHistogram, MetricsAggregator, get_metrics_aggregator
+
+from .conftest import get_simple_api_error_response, get_simple_api_response
+
+
+@pytest.fixture
+def mocked_metrics_logger():
+    with mock.patch("restlogger.metrics.log") as mock_logger:
+        yield mock_logger
+
+
+def test_latency_histogram_relative_error():
+    histogram = LatencyHistogram()
+    for value in (1, 100, 127, 128, 1000, 123456, 10**9):
+        index = histogram._get_index(value)
+        assert abs(histogram._get_value(index) - value) <= max(value / 64, 1)
+        assert histogram._get_index(histogram._get_value(index)) == index
+
+
+def test_latency_histogram_fixed_memory():
+    histogram = LatencyHistogram()
+    buckets = len(histogram.counts)
+    histogram.record(10**6)
+    assert len(histogram.counts) == buckets
+    assert histogram.max == histogram.max_value
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    assert histogram.to_dict() == {"count": 0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    for millisecond in range(1, 101):
+        histogram.record(millisecond / 1000)
+    summary = histogram.to_dict()
+    assert summary["count"] == 100
+    assert summary["p50"] == pytest.approx(0.050, rel=1 / 64)
+    assert summary["p90"] == pytest.approx(0.090, rel=1 / 64)
+    assert summary["p99"] == pytest.approx(0.099, rel=1 / 64)
+    assert summary["max"] == 0.1
+
+
+def test_latency_histogram_merge():
+    histogram, other_histogram = LatencyHistogram(), LatencyHistogram()
+    histogram.record(0.001)
+    other_histogram.record(0.5)
+    histogram.merge(other_histogram)
+    assert histogram.count == 2
+    assert histogram.percentile(100) == 0.5
+
+
+def test_metrics_aggregator_flush(mocked_metrics_logger):
+    aggregator = MetricsAggregator(interval=60)
+    aggregator.record("users", 200, 0.01)
+    aggregator.record("users", 200, 0.03)
+    aggregator.record("users", 500, 0.2)
+    aggregator.record("groups", 404, 0.005)
+    assert mocked_metrics_logger.mock_calls == []
+    with mock.patch("restlogger.metrics.time.monotonic", return_value=aggregator._started_at + 60):
+        aggregator.record("users", 201, 0.02)
+
+    name, args, kwargs = mocked_metrics_logger.mock_calls[0]
+    assert name == "log"
+    assert args == (logging.INFO, "Execution Metrics")
+    metrics = kwargs["extra"]["metrics"]
+    assert metrics["app"] == "Test"
+    assert metrics["timing"]["start"] <= metrics["timing"]["end"]
+    assert set(metrics["views"]) == {"users", "groups"}
+    users = metrics["views"]["users"]
+    assert users["count"] == 4
+    assert users["error_rate"] == 0.25
+    assert users["max"] == 0.2
+    assert set(users["statuses"]) == {"2xx", "5xx"}
+    assert users["statuses"]["2xx"]["count"] == 3
+    assert metrics["views"]["groups"]["error_rate"] == 0
+
+    mocked_metrics_logger.reset_mock()
+    aggregator.flush()
+    assert mocked_metrics_logger.mock_calls == []
+
+
+@override_settings(API_LOGGER_METRICS_ENABLED=True, API_LOGGER_URL_PATH_RULES={"/hot/": {"emit_record": False}})
+def test_middleware_metrics(api_request_factory, run_middleware, mocked_logger, mocked_metrics_logger):
+    aggregator = MetricsAggregator(interval=60)
+    with mock.patch("restlogger.middleware.get_metrics_aggregator", return_value=aggregator):
+        run_middleware(get_simple_api_response, api_request_factory.get("/hot/"))
+        assert mocked_logger.mock_calls == []
+        run_middleware(get_simple_api_error_response, api_request_factory.get("/foo/"))
+        assert mocked_logger.mock_calls[0].kwargs["extra"]["response"]["status_code"] == 400
+    aggregator.flush()
+    metrics = mocked_metrics_logger.mock_calls[0].kwargs["extra"]["metrics"]
+    assert metrics["views"][""]["count"] == 2
+    assert set(metrics["views"][""]["statuses"]) == {"2xx", "4xx"}
+
+
+def test_get_metrics_aggregator():
+    assert get_metrics_aggregator() is get_metrics_aggregator()
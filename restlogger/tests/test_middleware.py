@@ -1,5 +1,19 @@
+import dataclasses
+import hashlib
+import json
+import logging
+from unittest import mock
+
+import pytest
+from django.http import HttpResponse
 from django.test import override_settings
 
+from restlogger.conf import Config, get_config
+from restlogger.middleware import RESTRequestLoggingMiddleware
+from restlogger.parsers import register_response_parser, response_parsers
+from restlogger.records import OverheadTimer
+
+from .conftest import get_simple_api_response
 
 VALID_JWT = (
     "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJ1c2VyX2lkIjoxMjM0LCJpYXQiOjE1MTYyMzkwMjJ9"
@@ -18,7 +32,8 @@ def test_base_logging_with_standard_get_request(
     request = standard_request_factory.get("/foo")
     middleware_empty_django_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo"
     assert kwargs["extra"]["request"]["method"] == "GET"
@@ -38,7 +53,8 @@ def test_base_logging_with_api_get_request(api_request_factory, middleware_empty
     request = api_request_factory.get("/foo", format="json")
     middleware_empty_api_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo"
     assert kwargs["extra"]["request"]["method"] == "GET"
@@ -60,7 +76,8 @@ def test_base_logging_with_api_get_request_pdf_response(
     request = api_request_factory.get("/foo", format="json")
     middleware_pdf_api_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo"
     assert kwargs["extra"]["request"]["method"] == "GET"
@@ -83,7 +100,8 @@ def test_base_logging_with_api_get_request_pdf_response__hashed(
     request = api_request_factory.get("/foo", format="json")
     middleware_pdf_api_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo"
     assert kwargs["extra"]["request"]["method"] == "GET"
@@ -103,7 +121,8 @@ def test_base_logging_with_api_post_request(api_request_factory, middleware_empt
     request = api_request_factory.post("/foo", {"key": "value"}, format="json")
     middleware_empty_api_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo"
     assert kwargs["extra"]["request"]["method"] == "POST"
@@ -128,7 +147,8 @@ def test_base_logging_with_standard_post_request__400_hashed(
     request = api_request_factory.post("/foo", {"key": "value"}, format="json")
     middleware_empty_api_error_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]["response"]["status_code"] == 400
     assert kwargs["extra"]["response"]["data"] == "Hash 94cf9790a501aaac1e630052ed88932e"
 
@@ -141,7 +161,8 @@ def test_base_logging_with_standard_post_request__400_not_hashed(
     request = api_request_factory.post("/foo", {"key": "value"}, format="json")
     middleware_empty_api_error_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]["response"]["status_code"] == 400
     assert kwargs["extra"]["response"]["data"] == {"error": "A sample error"}
 
@@ -152,7 +173,8 @@ def test_base_logging_with_standard_post_request(
     request = standard_request_factory.post("/foo/", {"key": "value"})
     middleware_empty_django_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo/"
     assert kwargs["extra"]["request"]["method"] == "POST"
@@ -175,7 +197,8 @@ def test_base_logging_with_api_patch_request(api_request_factory, middleware_emp
     request = api_request_factory.patch("/foo/", {"key": "value"}, format="json")
     middleware_empty_api_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo/"
     assert kwargs["extra"]["request"]["method"] == "PATCH"
@@ -199,7 +222,8 @@ def test_base_logging_with_standard_patch_request(
     request = standard_request_factory.patch("/foo/", {"key": "value"})
     middleware_empty_django_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo/"
     assert kwargs["extra"]["request"]["method"] == "PATCH"
@@ -222,7 +246,8 @@ def test_base_logging_with_api_delete_request(api_request_factory, middleware_em
     request = api_request_factory.delete("/foo/", format="json")
     middleware_empty_api_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo/"
     assert kwargs["extra"]["request"]["method"] == "DELETE"
@@ -246,7 +271,8 @@ def test_base_logging_with_standard_delete_request(
     request = standard_request_factory.delete("/foo/")
     middleware_empty_django_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo/"
     assert kwargs["extra"]["request"]["method"] == "DELETE"
@@ -321,7 +347,8 @@ def test_logging_with_api_post__mask_sensitive_data(api_request_factory, middlew
     request = api_request_factory.patch("/foo/", data=payload, format="json")
     middleware_empty_api_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     request_body = kwargs["extra"]["request"]["body"]
     assert request_body["password"] == "***FILTERED***"
@@ -331,6 +358,15 @@ def test_logging_with_api_post__mask_sensitive_data(api_request_factory, middlew
     assert kwargs["extra"]["info"] == {"git_sha": "a-sha", "git_tag": "a-tag"}
 
 
+@override_settings(API_LOGGER_KEY_PATH_TO_HASH=(("request", "body"),))
+def test_logging_with_api_post__hashed_request_body_is_masked(api_request_factory, run_middleware, mocked_logger):
+    request = api_request_factory.post("/foo/", {"user": "a", "password": "hunter2"}, format="json")
+    run_middleware(get_simple_api_response, request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    masked_body = {"user": "a", "password": "***FILTERED***"}
+    assert kwargs["extra"]["request"]["body"] == "Hash " + hashlib.md5(str(masked_body).encode()).hexdigest()
+
+
 def test_logging_with_api_post__mask_sensitive_data_ok_if_list(
     api_request_factory, middleware_empty_api_response, mocked_logger
 ):
@@ -343,7 +379,8 @@ def test_logging_with_api_post__mask_sensitive_data_ok_if_list(
     request = api_request_factory.patch("/foo/", data=payload, format="json")
     middleware_empty_api_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     request_body = kwargs["extra"]["request"]["body"]
     assert request_body == [
@@ -362,7 +399,8 @@ def test_logging_with_api_get__no_git_sha_tag(
     request = api_request_factory.get("/foo", format="json")
     middleware_empty_api_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["info"] == {}
 
@@ -374,6 +412,240 @@ def test_logging_with_api_get__only_git_sha(
     request = api_request_factory.get("/foo", format="json")
     middleware_empty_api_response(request)
     name, args, kwargs = mocked_logger.mock_calls[0]
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["info"] == {"git_sha": "a-sha"}
+
+
+def test_skip_log_if_logger_is_not_enabled(api_request_factory, middleware_empty_api_response, mocked_logger):
+    mocked_logger.isEnabledFor = lambda level: level >= logging.WARNING
+    request = api_request_factory.post("/foo", {"key": "value"}, format="json")
+    with mock.patch.object(RESTRequestLoggingMiddleware, "_get_request_info") as mocked_get_request_info:
+        response = middleware_empty_api_response(request)
+    assert response.status_code == 200
+    mocked_get_request_info.assert_not_called()
+    assert not mocked_logger.mock_calls
+
+
+@override_settings(API_LOGGER_SERVER_ERROR_LOG_LEVEL=logging.ERROR)
+def test_log_level_escalated_on_server_error(api_request_factory, mocked_logger):
+    mocked_logger.isEnabledFor = lambda level: level >= logging.WARNING
+    middleware = RESTRequestLoggingMiddleware(lambda request: HttpResponse("Server error", status=500))
+    middleware(api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert name == "log"
+    assert args[0] == logging.ERROR
+    assert kwargs["extra"]["response"]["status_code"] == 500
+
+
+@override_settings(API_LOGGER_SERVER_ERROR_LOG_LEVEL=logging.ERROR)
+def test_log_level_policy_skips_successful_requests(api_request_factory, middleware_empty_api_response, mocked_logger):
+    mocked_logger.isEnabledFor = lambda level: level >= logging.WARNING
+    response = middleware_empty_api_response(api_request_factory.get("/foo"))
+    assert response.status_code == 200
+    assert not mocked_logger.mock_calls
+
+
+@override_settings(API_LOGGER_CLIENT_ERROR_LOG_LEVEL=logging.WARNING)
+def test_log_level_escalated_on_client_error(api_request_factory, middleware_empty_api_error_response, mocked_logger):
+    middleware_empty_api_error_response(api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert args[0] == logging.WARNING
+
+
+@override_settings(API_LOGGER_SLOW_REQUEST_THRESHOLD=0)
+def test_log_level_escalated_on_slow_request(api_request_factory, middleware_empty_api_response, mocked_logger):
+    middleware_empty_api_response(api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert args[0] == logging.WARNING
+
+
+def test_streaming_response_is_not_consumed(api_request_factory, middleware_streaming_csv_response, mocked_logger):
+    request = api_request_factory.get("/export", format="json")
+    response = middleware_streaming_csv_response(request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"] == {
+        "data": "Streaming response",
+        "status_code": 200,
+        "content_type": "text/csv",
+        "content_length": None,
+    }
+    content = b"".join(response.streaming_content)
+    assert content.startswith(b"0,value\n")
+    assert content.endswith(b"999,value\n")
+
+
+# closing the response sends request_finished, which checks the database connections left open by other tests
+@pytest.mark.django_db
+def test_file_response_declared_length(api_request_factory, mocked_logger, tmp_path):
+    from django.http import FileResponse
+
+    file_path = tmp_path / "export.bin"
+    file_path.write_bytes(b"\x00" * 2048)
+    middleware = RESTRequestLoggingMiddleware(lambda request: FileResponse(open(file_path, "rb")))
+    response = middleware(api_request_factory.get("/download"))
+    response.close()
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"]["data"] == "Streaming response"
+    assert kwargs["extra"]["response"]["content_length"] == 2048
+
+
+def test_binary_response_is_not_parsed(api_request_factory, middleware_image_response, mocked_logger):
+    request = api_request_factory.get("/image", format="json")
+    with mock.patch("restlogger.middleware.json.loads") as mocked_json_loads:
+        middleware_image_response(request)
+    mocked_json_loads.assert_not_called()
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"] == {
+        "data": "Not a serializable response",
+        "status_code": 200,
+        "content_type": "image/png",
+        "content_length": 1032,
+    }
+
+
+@override_settings(API_LOGGER_MAX_BODY_SIZE=10)
+def test_request_body_too_large_is_not_read(api_request_factory, mocked_logger):
+    def get_response(request):
+        # the stream is still available to the view, as the middleware did not read it
+        return HttpResponse(request.read())
+
+    request = api_request_factory.post("/foo", {"key": "a long enough value"}, format="json")
+    response = RESTRequestLoggingMiddleware(get_response)(request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert response.content == b'{"key":"a long enough value"}'
+    assert kwargs["extra"]["request"]["body"] == {"_truncated": True, "size": 29}
+
+
+def test_request_body_with_json_suffix_content_type(api_request_factory, middleware_empty_api_response, mocked_logger):
+    request = api_request_factory.post(
+        "/foo", b'{"key": "value"}', content_type="application/merge-patch+json; charset=utf-8"
+    )
+    middleware_empty_api_response(request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["request"]["body"] == {"key": "value"}
+
+
+@override_settings(API_LOGGER_REQUEST_BODY_CONTENT_TYPES=("text/plain",))
+def test_request_body_content_type_not_allowed(api_request_factory, middleware_empty_api_response, mocked_logger):
+    request = api_request_factory.post("/foo", {"key": "value"}, format="json")
+    middleware_empty_api_response(request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["request"]["body"] == "Not a JSON body"
+
+
+@override_settings(API_LOGGER_KEY_PATH_TO_HASH=(("response", "data"),), API_LOGGER_HASH_RESPONSE_CONTENT=True)
+def test_response_content_hashed_without_parsing(api_request_factory, middleware_empty_api_response, mocked_logger):
+    request = api_request_factory.get("/foo", format="json")
+    with mock.patch.object(RESTRequestLoggingMiddleware, "_get_response_data") as mocked_get_response_data:
+        response = middleware_empty_api_response(request)
+    mocked_get_response_data.assert_not_called()
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    expected_digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+    assert kwargs["extra"]["response"]["data"] == f"Hash {expected_digest}"
+
+
+def test_server_timing_header_disabled_by_default(api_request_factory, middleware_empty_api_response, mocked_logger):
+    response = middleware_empty_api_response(api_request_factory.get("/foo"))
+    assert "Server-Timing" not in response.headers
+
+
+@override_settings(API_LOGGER_SERVER_TIMING=True)
+def test_server_timing_header(api_request_factory, middleware_empty_api_response, mocked_logger):
+    response = middleware_empty_api_response(api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    timing = kwargs["extra"]["execution"]["timing"]
+    assert response.headers["Server-Timing"] == f"total;dur={timing['duration'] * 1000:.3f}"
+    assert (timing["end"] - timing["start"]).total_seconds() == pytest.approx(timing["duration"], abs=1e-6)
+
+
+@override_settings(API_LOGGER_LOG_OVERHEAD=True)
+def test_logger_overhead_section(api_request_factory, run_middleware, mocked_logger):
+    OverheadTimer.previous_emission = None
+    request = api_request_factory.post(
+        "/foo", {"key": "value"}, format="json", HTTP_AUTHORIZATION=f"Bearer {VALID_JWT}"
+    )
+    run_middleware(get_simple_api_response, request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert set(kwargs["extra"]["logger_overhead"]) == {
+        "body_copy",
+        "jwt_decode",
+        "request_parsing",
+        "response_parsing",
+        "redaction",
+    }
+    assert OverheadTimer.previous_emission is not None
+    run_middleware(get_simple_api_response, api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[1]
+    assert kwargs["extra"]["logger_overhead"]["previous_emission"] >= 0
+
+
+def test_logger_overhead_section_disabled_by_default(
+    api_request_factory, middleware_empty_api_response, mocked_logger
+):
+    middleware_empty_api_response(api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert "logger_overhead" not in kwargs["extra"]
+
+
+def test_middleware_with_given_config(api_request_factory, mocked_logger):
+    config = dataclasses.replace(get_config(), app_name="Given", info={})
+    middleware = RESTRequestLoggingMiddleware(get_simple_api_response, config=config)
+    middleware(api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["execution"]["app"] == "Given"
+    assert kwargs["extra"]["info"] == {}
+    RESTRequestLoggingMiddleware(get_simple_api_response, config=dataclasses.replace(config, enabled=False))(
+        api_request_factory.get("/foo")
+    )
+    assert len(mocked_logger.mock_calls) == 1
+
+
+def test_middleware_given_config_rules_routing_and_redaction(api_request_factory, mocked_logger):
+    config = Config(url_path_to_exclude=("/skip",), sensitive_keys=("token",), headers_to_exclude=("X-Trace",))
+    middleware = RESTRequestLoggingMiddleware(get_simple_api_response, config=config)
+    middleware(api_request_factory.get("/skip/a"))
+    assert not mocked_logger.mock_calls
+    middleware(api_request_factory.post("/foo", {"token": "t"}, format="json", HTTP_X_TRACE="1"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["request"]["body"] == {"token": "***FILTERED***"}
+    assert "X-Trace" not in kwargs["extra"]["request"]["headers"]
+    assert kwargs["extra"]["response"]["data"].startswith("Hash ")
+
+
+def get_django_json_response(request):
+    return HttpResponse(b'{"key": "value", "password": "secret"}', content_type="application/json; charset=utf-8")
+
+
+def test_json_response_with_parameters_is_parsed(api_request_factory, run_middleware, mocked_logger):
+    run_middleware(get_django_json_response, api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"]["data"] == {"key": "value", "password": "secret"}
+
+
+@override_settings(API_LOGGER_MAX_RESPONSE_SIZE=16)
+def test_response_too_large_is_not_parsed(api_request_factory, run_middleware, mocked_logger):
+    run_middleware(get_django_json_response, api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"]["data"] == {"_truncated": True, "size": 38}
+
+
+def test_registered_response_parser(api_request_factory, middleware_image_response, mocked_logger):
+    register_response_parser("image/*", lambda response: {"image_size": len(response.content)}, reads_content=False)
+    try:
+        middleware_image_response(api_request_factory.get("/image"))
+    finally:
+        response_parsers.unregister("image/*")
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"] == {"data": {"image_size": 1032}, "status_code": 200}
+
+
+@override_settings(API_LOGGER_PAYLOAD_MAX_LIST_ITEMS=2)
+def test_response_data_is_shaped(api_request_factory, run_middleware, mocked_logger):
+    def get_response(request):
+        return HttpResponse(json.dumps([{"id": index} for index in range(100)]), content_type="application/json")
+
+    run_middleware(get_response, api_request_factory.get("/foo"))
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"]["data"] == [{"id": 0}, {"id": 1}, {"_truncated": True, "len": 100}]
@@ -0,0 +1,121 @@
+import logging
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.test import override_settings
+from django.utils.functional import SimpleLazyObject
+
+from restlogger.emitters import get_queue_emitter
+from restlogger.middleware import RESTRequestLoggingMiddleware
+
+from .conftest import (
+    as_async,
+    get_pdf_api_response,
+    get_simple_api_error_response,
+    get_simple_api_response,
+    get_simple_django_response,
+)
+
+
+def test_middleware_is_sync_and_async_capable():
+    assert RESTRequestLoggingMiddleware.sync_capable
+    assert RESTRequestLoggingMiddleware.async_capable
+
+
+def test_middleware_async_mode_follows_get_response():
+    assert not iscoroutinefunction(RESTRequestLoggingMiddleware(get_simple_api_response))
+    assert iscoroutinefunction(RESTRequestLoggingMiddleware(as_async(get_simple_api_response)))
+
+
+def test_logging_with_standard_get_request(standard_request_factory, run_middleware, mocked_logger):
+    request = standard_request_factory.get("/foo")
+    response = run_middleware(get_simple_django_response, request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert response.status_code == 200
+    assert name == "log"
+    assert args[0] == logging.INFO
+    assert kwargs["extra"]["request"]["url"] == "/foo"
+    assert kwargs["extra"]["request"]["method"] == "GET"
+    assert kwargs["extra"]["response"]["status_code"] == 200
+    assert kwargs["extra"]["execution"]["app"] == "Test"
+    assert kwargs["extra"]["execution"]["timing"]["duration"]
+    assert kwargs["extra"]["info"] == {"git_sha": "a-sha", "git_tag": "a-tag"}
+
+
+def test_logging_with_api_post_request(api_request_factory, run_middleware, mocked_logger):
+    request = api_request_factory.post("/foo", {"key": "value", "password": "secret"}, format="json")
+    run_middleware(get_simple_api_response, request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert name == "log"
+    assert args[0] == logging.INFO
+    assert kwargs["extra"]["request"]["method"] == "POST"
+    assert kwargs["extra"]["request"]["body"] == {"key": "value", "password": "***FILTERED***"}
+    assert kwargs["extra"]["response"]["data"] == {"content": "A simple API response"}
+
+
+def test_logging_with_api_get_request_pdf_response(api_request_factory, run_middleware, mocked_logger):
+    request = api_request_factory.get("/foo", format="json")
+    run_middleware(get_pdf_api_response, request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"]["data"] == {"content": "PDF bytes response"}
+
+
+@override_settings(API_LOGGER_KEY_PATH_TO_HASH=(("response", "data"),))
+def test_logging_with_api_post_request__400_hashed(api_request_factory, run_middleware, mocked_logger):
+    request = api_request_factory.post("/foo", {"key": "value"}, format="json")
+    run_middleware(get_simple_api_error_response, request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"]["status_code"] == 400
+    assert kwargs["extra"]["response"]["data"] == "Hash 94cf9790a501aaac1e630052ed88932e"
+
+
+def test_skip_log_if_path_is_excluded(standard_request_factory, run_middleware, mocked_logger):
+    request = standard_request_factory.get("/path1/")
+    response = run_middleware(get_simple_api_response, request)
+    assert response.status_code == 200
+    assert not mocked_logger.mock_calls
+
+
+@pytest.mark.parametrize("lazy_record, runs_on_loop", [(False, False), (True, True)])
+def test_async_record_is_built_off_the_event_loop_unless_lazy(
+    api_request_factory, mocked_logger, lazy_record, runs_on_loop
+):
+    middleware = RESTRequestLoggingMiddleware(as_async(get_simple_api_response))
+    log_info = middleware._log_info
+    log_info_threads = []
+
+    def spy_log_info(*args, **kwargs):
+        log_info_threads.append(threading.get_ident())
+        return log_info(*args, **kwargs)
+
+    async def run(request):
+        loop_thread = threading.get_ident()
+        await middleware(request)
+        return loop_thread
+
+    middleware._log_info = spy_log_info
+    with override_settings(API_LOGGER_QUEUE_ENABLED=True, API_LOGGER_LAZY_RECORD=lazy_record):
+        loop_thread = async_to_sync(run)(api_request_factory.get("/foo"))
+        assert get_queue_emitter().flush(timeout=5)
+    assert (log_info_threads == [loop_thread]) is runs_on_loop
+    assert mocked_logger.mock_calls
+
+
+@pytest.mark.parametrize("lazy_record", [False, True])
+def test_lazy_user_is_resolved_by_the_request_thread(api_request_factory, run_middleware, mocked_logger, lazy_record):
+    user_threads = []
+
+    def get_user():
+        user_threads.append(threading.current_thread())
+        return "alice"
+
+    request = api_request_factory.get("/foo")
+    request.user = SimpleLazyObject(get_user)
+    with override_settings(API_LOGGER_QUEUE_ENABLED=True, API_LOGGER_LAZY_RECORD=lazy_record):
+        run_middleware(get_simple_api_response, request)
+        assert get_queue_emitter().flush(timeout=5)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["request"]["user"] == "alice"
+    # neither in the queue worker nor, under ASGI, in a one-off worker thread, but in the thread of the request
+    assert [thread.name for thread in user_threads] == ["MainThread"]
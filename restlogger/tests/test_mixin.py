@@ -1,7 +1,13 @@
+import logging
+
 import pytest
+from django.test import override_settings
 from rest_framework import status
 
+from restlogger import context
+from restlogger.context import execution_log_scope
 from restlogger.middleware import RESTRequestLoggingMiddleware
+from restlogger.mixins import ExecutionLogMixin, LogStep, TimingStep, timing_step
 
 
 @pytest.mark.freeze_time("2023-01-01", auto_tick_seconds=0.1)
@@ -13,7 +19,8 @@ def test_execution_log_mixin_standard(standard_request_factory, standard_view_wi
 
     name, args, kwargs = mocked_logger.mock_calls[0]
     assert response.status_code == status.HTTP_200_OK
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo"
     assert kwargs["extra"]["request"]["method"] == "GET"
@@ -41,7 +48,8 @@ def test_execution_log_mixin_api(api_request_factory, api_view_with_mixin, mocke
 
     name, args, kwargs = mocked_logger.mock_calls[0]
     assert response.status_code == status.HTTP_200_OK
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["request"]["url"] == "/foo"
     assert kwargs["extra"]["request"]["method"] == "GET"
@@ -72,6 +80,60 @@ def test_execution_log_mixin_api__timing_step_empty_if_not_stopped(
 
     name, args, kwargs = mocked_logger.mock_calls[0]
     assert response.status_code == status.HTTP_200_OK
-    assert name == "info"
+    assert name == "log"
+    assert args[0] == logging.INFO
     assert kwargs["extra"]
     assert kwargs["extra"]["timing_steps"] == {"test": 0.6}
+
+
+@pytest.mark.freeze_time("2023-01-01", auto_tick_seconds=0.1)
+@override_settings(API_LOGGER_SERVER_TIMING=True)
+def test_execution_log_mixin_server_timing(api_request_factory, api_view_with_mixin, mocked_logger):
+    request = api_request_factory.get("/foo")
+    middleware = RESTRequestLoggingMiddleware(api_view_with_mixin.as_view())
+    response = middleware(request)
+
+    assert response.headers["Server-Timing"] == "total;dur=300.000, test;dur=100.000"
+
+
+def test_log_step_serialization_does_not_copy():
+    detail = {"nested": {"key": "value"}}
+    assert LogStep("step", detail).to_dict()["detail"] is detail
+    assert not hasattr(LogStep("step"), "__dict__")
+    assert not hasattr(TimingStep(), "__dict__")
+
+
+@pytest.mark.freeze_time("2023-01-01", auto_tick_seconds=0.1)
+def test_timing_step_context_manager_and_decorator():
+    class TestView(ExecutionLogMixin):
+        @timing_step("item")
+        def process_item(self):
+            with self.timing_step("item"):
+                pass
+
+        def get(self):
+            with self.timing_step("total"):
+                for _ in range(3):
+                    self.process_item()
+            with pytest.raises(ValueError), self.timing_step("failing"):
+                raise ValueError()
+
+    view = TestView()
+    # as during dispatch(), the view adapts the execution log of the current request
+    with execution_log_scope() as execution_log:
+        view.execution_log = execution_log
+        view.get()
+    execution_log_info = view.get_execution_log_info()
+    assert execution_log_info["timing_steps"] == {"total": 0.7, "item": pytest.approx(0.3), "failing": 0.1}
+    assert execution_log_info["timing_step_counts"] == {"item": 3}
+
+
+def test_timing_step_decorator_is_the_context_one():
+    assert timing_step is context.timing_step
+
+
+def test_timing_step_counts_only_when_repeated():
+    view = ExecutionLogMixin()
+    view.start_timing_step("once")
+    view.stop_timing_step("once")
+    assert "timing_step_counts" not in view.get_execution_log_info()
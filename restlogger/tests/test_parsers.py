@@ -0,0 +1,82 @@
+import pytest
+from django.http import HttpResponse
+
+from restlogger.parsers import (
+    ResponseParser,
+    ResponseParserRegistry,
+    extract_json,
+    extract_pdf,
+    get_media_type_specificity,
+    response_parsers,
+)
+
+
+@pytest.mark.parametrize(
+    "content_type, extract",
+    [
+        ("application/json", extract_json),
+        ("application/json; charset=utf-8", extract_json),
+        ("application/problem+json", extract_json),
+        ("application/pdf", extract_pdf),
+        ("image/png", None),
+        ("text/csv", None),
+        ("", None),
+    ],
+)
+def test_default_response_parsers(content_type, extract):
+    parser = response_parsers.get_parser(content_type)
+    assert (parser.extract if parser else None) is extract
+
+
+def test_media_type_specificity():
+    patterns = ["*/*", "image/*", "application/*+json", "application/json"]
+    assert sorted(patterns, key=get_media_type_specificity, reverse=True) == [
+        "application/json",
+        "application/*+json",
+        "image/*",
+        "*/*",
+    ]
+
+
+def test_registry_most_specific_pattern_wins():
+    registry = ResponseParserRegistry()
+    registry.register("*/*", lambda response: "any")
+    registry.register("image/*", lambda response: "image")
+    assert registry.get_parser("image/png").extract(None) == "image"
+    assert registry.get_parser("text/plain").extract(None) == "any"
+    registry.register("image/png", lambda response: "png")
+    assert registry.get_parser("image/png").extract(None) == "png"
+    registry.unregister("*/*")
+    assert registry.get_parser("text/plain") is None
+
+
+def test_registry_register_decorator():
+    registry = ResponseParserRegistry()
+
+    @registry.register(("text/plain", "text/markdown"), max_size=8)
+    def extract_text(response):
+        return {"text": response.content.decode()}
+
+    parser = registry.get_parser("text/markdown; charset=utf-8")
+    assert parser == ResponseParser(extract_text, max_size=8)
+    assert parser.parse(HttpResponse("a text", content_type="text/plain")) == {"text": "a text"}
+    assert parser.parse(HttpResponse("a longer text", content_type="text/plain")) == {"_truncated": True, "size": 13}
+
+
+def test_parser_reuses_parsed_data():
+    response = HttpResponse(b'{"key": "value"}', content_type="application/json")
+    parser = ResponseParser(extract_json, reuse_data=True)
+    assert parser.parse(response) == {"key": "value"}
+    response.data = {"key": "parsed"}
+    assert parser.parse(response, default_max_size=1) == {"key": "parsed"}
+
+
+def test_parser_size_limit():
+    response = HttpResponse(b'{"key": "value"}', content_type="application/json")
+    assert ResponseParser(extract_json).parse(response, default_max_size=4) == {"_truncated": True, "size": 16}
+    assert ResponseParser(extract_json, max_size=64).parse(response, default_max_size=4) == {"key": "value"}
+    response.headers["Content-Length"] = "1000"
+    assert ResponseParser(extract_json, max_size=64).parse(response) == {"_truncated": True, "size": 1000}
+    assert ResponseParser(extract_pdf, max_size=4, reads_content=False).parse(response) == {
+        "content": "PDF bytes response"
+    }
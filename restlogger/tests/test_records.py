@@ -0,0 +1,72 @@
+import logging
+from unittest import mock
+
+from django.test import override_settings
+
+from restlogger.middleware import RESTRequestLoggingMiddleware
+from restlogger.records import ExecutionLogRecord, LazySection, OverheadTimer, time_phase
+
+
+def test_lazy_section_is_evaluated_once_on_first_access():
+    factory = mock.Mock(return_value={"key": "value"})
+    section = LazySection(factory)
+    assert not section.evaluated
+    factory.assert_not_called()
+    assert section["key"] == "value"
+    assert section == {"key": "value"}
+    assert dict(section) == {"key": "value"}
+    assert section.evaluated
+    factory.assert_called_once_with()
+
+
+def test_execution_log_record_to_dict():
+    record = ExecutionLogRecord({"request": LazySection(lambda: {"url": "/foo"}), "task_info": {"key": "value"}})
+    assert record.to_dict() == {"request": {"url": "/foo"}, "task_info": {"key": "value"}}
+
+
+def test_execution_log_record_sections_are_not_evaluated_by_make_record():
+    request_factory = mock.Mock(return_value={"url": "/foo"})
+    record = ExecutionLogRecord({"request": LazySection(request_factory), "execution": {"name": "view"}})
+    log_record = logging.getLogger("restlogger").makeRecord(
+        "restlogger", logging.INFO, "", 0, "msg", (), None, extra=record
+    )
+    assert log_record.execution == {"name": "view"}
+    request_factory.assert_not_called()
+    assert log_record.request["url"] == "/foo"
+
+
+@override_settings(API_LOGGER_LAZY_RECORD=True)
+def test_middleware_lazy_record(api_request_factory, middleware_empty_api_response, mocked_logger):
+    request = api_request_factory.post("/foo", {"key": "value"}, format="json")
+    with mock.patch.object(
+        RESTRequestLoggingMiddleware, "_get_response_data", return_value={"content": "data"}
+    ) as mocked_get_response_data:
+        middleware_empty_api_response(request)
+        name, args, kwargs = mocked_logger.mock_calls[0]
+        assert isinstance(kwargs["extra"], ExecutionLogRecord)
+        assert kwargs["extra"]["execution"]["app"] == "Test"
+        assert kwargs["extra"]["request"]["body"] == {"key": "value"}
+        mocked_get_response_data.assert_not_called()
+        assert kwargs["extra"]["response"]["data"] == {"content": "data"}
+        mocked_get_response_data.assert_called_once()
+
+
+@override_settings(API_LOGGER_LAZY_RECORD=True, API_LOGGER_KEY_PATH_TO_HASH=(("response", "data"),))
+def test_middleware_lazy_record__hashed(api_request_factory, middleware_empty_api_error_response, mocked_logger):
+    request = api_request_factory.post("/foo", {"key": "value"}, format="json")
+    middleware_empty_api_error_response(request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"]["data"] == "Hash 94cf9790a501aaac1e630052ed88932e"
+
+
+def test_overhead_timer():
+    OverheadTimer.previous_emission = None
+    overhead = OverheadTimer()
+    with overhead.phase("parsing"):
+        pass
+    with overhead.phase("parsing"), time_phase(overhead, "redaction"):
+        pass
+    with time_phase(None, "redaction"):
+        pass
+    assert set(overhead.phases) == {"parsing", "redaction"}
+    assert overhead.phases["parsing"] >= overhead.phases["redaction"] >= 0
@@ -0,0 +1,83 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+
+from restlogger.routing import DEFAULT_ROUTE_RULE, PathRouter, RouteRule, get_path_router
+
+
+def test_path_router_default():
+    assert PathRouter().match("/foo/") is DEFAULT_ROUTE_RULE
+
+
+def test_path_router_exclude():
+    router = PathRouter(exclude=("/health", "/admin/"))
+    assert router.match("/health") is None
+    assert router.match("/healthz/") is None
+    assert router.match("/admin/users/") is None
+    assert router.match("/admin") is DEFAULT_ROUTE_RULE
+    assert router.match("/api/") is DEFAULT_ROUTE_RULE
+
+
+def test_path_router_include():
+    router = PathRouter(include=("/api/",), exclude=("/api/internal/",))
+    assert router.match("/api/users/") is DEFAULT_ROUTE_RULE
+    assert router.match("/api/internal/jobs/") is None
+    assert router.match("/static/app.js") is None
+
+
+def test_path_router_rules_longest_prefix_wins():
+    router = PathRouter(
+        rules={
+            "/upload/": {"capture_request_body": False, "capture_response_body": False},
+            "/upload/small/": {"capture_request_body": True},
+        }
+    )
+    assert router.match("/upload/big/") == RouteRule(capture_request_body=False, capture_response_body=False)
+    assert router.match("/upload/small/1/") == RouteRule(capture_request_body=True, capture_response_body=False)
+    assert router.match("/uploads/") is DEFAULT_ROUTE_RULE
+
+
+def test_path_router_regex_rules():
+    router = PathRouter(
+        rules={"/api/": {"capture_response_body": True}},
+        regex_rules={r"^/api/v\d+/export/": {"capture_response_body": False}},
+    )
+    assert router.match("/api/v2/export/") == RouteRule(capture_response_body=False)
+    assert router.match("/api/v2/users/") == DEFAULT_ROUTE_RULE
+    assert router.match("/api/v2/users/") is router.match("/api/v2/users/")
+
+
+def test_path_router_unknown_option():
+    with pytest.raises(ImproperlyConfigured):
+        PathRouter(rules={"/upload/": {"capture_everything": False}})
+
+
+def test_path_router_rebuilt_on_setting_changed():
+    assert get_path_router().match("/path2/") is DEFAULT_ROUTE_RULE
+    with override_settings(API_LOGGER_URL_PATH_TO_EXCLUDE=("/path2/",)):
+        assert get_path_router().match("/path2/") is None
+    assert get_path_router().match("/path2/") is DEFAULT_ROUTE_RULE
+
+
+@override_settings(API_LOGGER_URL_PATH_RULES={"/upload/": {"capture_request_body": False}})
+def test_route_without_request_body_capture(api_request_factory, middleware_empty_api_response, mocked_logger):
+    request = api_request_factory.post("/upload/", {"key": "value"}, format="json")
+    middleware_empty_api_response(request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["request"]["body"] == "Body not captured"
+    assert kwargs["extra"]["response"]["data"] == {"content": "A simple API response"}
+
+
+@override_settings(API_LOGGER_URL_PATH_RULES={"/export/": {"capture_response_body": False}})
+def test_route_without_response_body_capture(api_request_factory, middleware_empty_api_response, mocked_logger):
+    request = api_request_factory.get("/export/", format="json")
+    middleware_empty_api_response(request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["response"]["data"] == "Body not captured"
+    assert kwargs["extra"]["response"]["content_type"] == "application/json"
+
+
+@override_settings(API_LOGGER_URL_PATH_RULES={"/health/": {"enabled": False}})
+def test_route_disabled(api_request_factory, middleware_empty_api_response, mocked_logger):
+    middleware_empty_api_response(api_request_factory.get("/health/"))
+    assert not mocked_logger.mock_calls
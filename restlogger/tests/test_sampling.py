@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from restlogger.routing import DEFAULT_ROUTE_RULE, RouteRule
+from restlogger.sampling import SamplingDecision, get_tail_sampling_reason
+
+from .conftest import get_simple_api_error_response, get_simple_api_response
+
+
+def test_sampling_decision_without_sampling():
+    sampling = SamplingDecision.head(DEFAULT_ROUTE_RULE)
+    assert sampling == SamplingDecision(rate=1.0, head_sampled=True)
+    assert sampling.tail(500, 10) is sampling
+    assert sampling.keep
+    assert sampling.weight == 1
+
+
+@override_settings(API_LOGGER_SAMPLE_RATE=0.25)
+def test_sampling_decision_head():
+    with mock.patch("restlogger.sampling.random.random", return_value=0.1):
+        sampling = SamplingDecision.head(DEFAULT_ROUTE_RULE)
+    assert sampling.head_sampled and sampling.keep
+    assert sampling.to_dict() == {"rate": 0.25, "decision": "head", "weight": 4.0}
+    with mock.patch("restlogger.sampling.random.random", return_value=0.5):
+        sampling = SamplingDecision.head(DEFAULT_ROUTE_RULE)
+    assert not sampling.head_sampled and not sampling.keep
+
+
+def test_sampling_decision_route_rate():
+    with mock.patch("restlogger.sampling.random.random", return_value=0.5):
+        assert not SamplingDecision.head(RouteRule(sample_rate=0.1)).head_sampled
+        assert SamplingDecision.head(RouteRule(sample_rate=1)).head_sampled
+
+
+def test_sampling_decision_tail():
+    sampling = SamplingDecision(rate=0.1, head_sampled=False).tail(503, 0.1)
+    assert sampling.keep
+    assert sampling.to_dict() == {"rate": 0.1, "decision": "tail", "reason": "server_error", "weight": 1.0}
+
+
+def test_tail_sampling_reason():
+    assert get_tail_sampling_reason(200, 0.1) is None
+    assert get_tail_sampling_reason(404, 0.1) == "client_error"
+    assert get_tail_sampling_reason(500, 0.1) == "server_error"
+    with override_settings(API_LOGGER_SAMPLE_KEEP_CLIENT_ERRORS=False, API_LOGGER_SLOW_REQUEST_THRESHOLD=1):
+        assert get_tail_sampling_reason(404, 0.1) is None
+        assert get_tail_sampling_reason(200, 1.5) == "slow"
+
+
+@override_settings(API_LOGGER_SAMPLE_RATE=0.5)
+def test_middleware_drops_unsampled_request(api_request_factory, run_middleware, mocked_logger):
+    request = api_request_factory.get("/foo", format="json")
+    with mock.patch("restlogger.sampling.random.random", return_value=0.9):
+        response = run_middleware(get_simple_api_response, request)
+    assert response.status_code == 200
+    assert mocked_logger.mock_calls == []
+
+
+@override_settings(API_LOGGER_SAMPLE_RATE=0.5)
+def test_middleware_logs_sampled_request(api_request_factory, run_middleware, mocked_logger):
+    request = api_request_factory.post("/foo", {"key": "value"}, format="json")
+    with mock.patch("restlogger.sampling.random.random", return_value=0.1):
+        run_middleware(get_simple_api_response, request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["request"]["body"] == {"key": "value"}
+    assert kwargs["extra"]["execution"]["sampling"] == {"rate": 0.5, "decision": "head", "weight": 2.0}
+
+
+@override_settings(API_LOGGER_SAMPLE_RATE=0.5)
+def test_middleware_keeps_unsampled_error(api_request_factory, run_middleware, mocked_logger):
+    request = api_request_factory.post("/foo", {"key": "value"}, format="json")
+    with mock.patch("restlogger.sampling.random.random", return_value=0.9):
+        run_middleware(get_simple_api_error_response, request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert kwargs["extra"]["request"]["body"] == "Body not sampled"
+    assert kwargs["extra"]["response"]["data"] == {"error": "A sample error"}
+    assert kwargs["extra"]["execution"]["sampling"] == {
+        "rate": 0.5,
+        "decision": "tail",
+        "reason": "client_error",
+        "weight": 1.0,
+    }
+
+
+def test_middleware_without_sampling(api_request_factory, middleware_empty_api_response, mocked_logger):
+    request = api_request_factory.get("/foo", format="json")
+    middleware_empty_api_response(request)
+    name, args, kwargs = mocked_logger.mock_calls[0]
+    assert "sampling" not in kwargs["extra"]["execution"]
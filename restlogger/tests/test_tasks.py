@@ -0,0 +1,126 @@
+import logging
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+
+from restlogger import context
+from restlogger.tasks import TaskRun, connect_celery_signals, log_task
+from restlogger.utils import FILTERED
+
+
+@pytest.fixture
+def mocked_task_logger():
+    with mock.patch("restlogger.tasks.log") as mock_logger:
+        mock_logger.isEnabledFor = lambda level: True
+        yield mock_logger
+
+
+@log_task(name="send")
+def send(recipient, password=None, items=()):
+    context.add_log_step("sending", {"recipient": recipient})
+    with context.timing_step("render"):
+        context.add_task_info({"items": len(items)})
+    return {"sent": True, "token": "abc"}
+
+
+@log_task()
+def fail():
+    raise ValueError("boom")
+
+
+def test_log_task(mocked_task_logger):
+    assert send("john@example.com", password="secret", items=[1, 2]) == {"sent": True, "token": "abc"}
+    name, args, kwargs = mocked_task_logger.mock_calls[0]
+    assert args == (logging.INFO, "Task Execution Log")
+    extra = kwargs["extra"]
+    assert extra["task"] == {
+        "name": "send",
+        "args": ["john@example.com"],
+        "kwargs": {"password": FILTERED, "items": [1, 2]},
+        "status": "success",
+        "result": {"sent": True, "token": "abc"},
+    }
+    assert extra["execution"]["app"] == "Test"
+    assert extra["execution"]["name"] == "send"
+    assert set(extra["execution"]["timing"]) == {"start", "end", "duration"}
+    assert extra["info"] == {"git_sha": "a-sha", "git_tag": "a-tag"}
+    assert extra["task_info"] == {"items": 2}
+    assert extra["log_steps"] == [{"msg": "sending", "detail": {"recipient": "john@example.com"}}]
+    assert set(extra["timing_steps"]) == {"render"}
+
+
+def test_log_task_failure(mocked_task_logger):
+    with override_settings(API_LOGGER_SERVER_ERROR_LOG_LEVEL=logging.ERROR), pytest.raises(ValueError):
+        fail()
+    name, args, kwargs = mocked_task_logger.mock_calls[0]
+    assert args[0] == logging.ERROR
+    assert kwargs["extra"]["task"] == {
+        "name": "restlogger.tests.test_tasks.fail",
+        "args": [],
+        "kwargs": {},
+        "status": "failure",
+        "exception": "ValueError('boom')",
+    }
+    assert "task_info" not in kwargs["extra"]
+
+
+@override_settings(API_LOGGER_HASH_RESPONSE_DATA=True)
+def test_log_task_hashed_result(mocked_task_logger):
+    send("john@example.com")
+    name, args, kwargs = mocked_task_logger.mock_calls[0]
+    assert kwargs["extra"]["task"]["result"].startswith("Hash ")
+
+
+def test_log_task_without_args_and_result(mocked_task_logger):
+    log_task(name="quiet", log_args=False, log_result=False)(lambda secret: secret)("value")
+    name, args, kwargs = mocked_task_logger.mock_calls[0]
+    assert kwargs["extra"]["task"] == {"name": "quiet", "status": "success"}
+
+
+def test_log_task_does_not_write_to_the_request_execution_log(mocked_task_logger):
+    with context.execution_log_scope() as execution_log:
+        send("john@example.com")
+    assert not execution_log
+
+
+@override_settings(API_LOGGER_ENABLED=False)
+def test_log_task_disabled(mocked_task_logger):
+    send("john@example.com")
+    assert mocked_task_logger.mock_calls == []
+
+
+def test_task_run_id(mocked_task_logger):
+    task_run = TaskRun("task", task_id="1234")
+    task_run.start()
+    task_run.finish()
+    name, args, kwargs = mocked_task_logger.mock_calls[0]
+    assert kwargs["extra"]["task"]["id"] == "1234"
+
+
+def test_celery_signals(mocked_task_logger):
+    celery = pytest.importorskip("celery")
+    app = celery.Celery("test", set_as_current=False)
+    app.conf.task_always_eager = True
+
+    @app.task(name="add")
+    def add(x, y):
+        context.add_log_step("adding")
+        return x + y
+
+    @app.task(name="divide")
+    def divide(x, y):
+        return x / y
+
+    connect_celery_signals()
+    assert add.delay(1, 2).get() == 3
+    divide.apply((1, 0))
+
+    (name, args, kwargs), (_, failure_args, failure_kwargs) = mocked_task_logger.mock_calls
+    assert kwargs["extra"]["task"]["name"] == "add"
+    assert kwargs["extra"]["task"]["args"] == [1, 2]
+    assert kwargs["extra"]["task"]["result"] == 3
+    assert kwargs["extra"]["task"]["id"]
+    assert kwargs["extra"]["log_steps"] == [{"msg": "adding", "detail": {}}]
+    assert failure_kwargs["extra"]["task"]["status"] == "failure"
+    assert failure_kwargs["extra"]["task"]["exception"] == "ZeroDivisionError('division by zero')"
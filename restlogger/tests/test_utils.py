@@ -1,4 +1,30 @@
-from restlogger.utils import apply_hash_filter, decode_jwt_token_payload, exclude_path, mask_sensitive_data
+import hashlib
+from unittest import mock
+
+import jwt
+
+import pytest
+from django.test import override_settings
+
+from restlogger.conf import Config
+from restlogger.utils import (
+    MAX_ITEMS_EXCEEDED,
+    JWTPayloadCache,
+    SensitiveKeyMatcher,
+    apply_hash_filter,
+    decode_jwt_token_payload,
+    exclude_path,
+    get_jwt_payload_cache,
+    get_jwt_token_payload,
+    get_masked_copy,
+    get_sensitive_key_matcher,
+    hash_bytes,
+    hash_object,
+    mask_sensitive_data,
+    mask_sensitive_data_dict,
+    match_media_type,
+    redact,
+)
 
 
 def test_decode_jwt_token_payload_ok():
@@ -17,6 +43,59 @@ def test_decode_jwt_token_payload_ko():
     assert payload == {}
 
 
+def test_jwt_payload_cache_hits():
+    cache = JWTPayloadCache(max_size=2)
+    token = jwt.encode({"user_id": 1}, "secret")
+    assert cache.get_payload(token) == {"user_id": 1}
+    payload = cache.get_payload(token)
+    assert payload == {"user_id": 1}
+    payload["user_id"] = 2
+    assert cache.get_payload(token) == {"user_id": 1}
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 1}
+
+
+def test_jwt_payload_cache_lru_eviction():
+    cache = JWTPayloadCache(max_size=2)
+    tokens = [jwt.encode({"user_id": user_id}, "secret") for user_id in range(3)]
+    cache.get_payload(tokens[0])
+    cache.get_payload(tokens[1])
+    cache.get_payload(tokens[0])
+    cache.get_payload(tokens[2])
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 3}
+    cache.get_payload(tokens[0])
+    cache.get_payload(tokens[1])
+    assert cache.stats() == {"size": 2, "hits": 2, "misses": 4}
+
+
+def test_jwt_payload_cache_expiration():
+    cache = JWTPayloadCache(max_size=2)
+    token = jwt.encode({"user_id": 1, "exp": 2000000000}, "secret")
+    cache.get_payload(token)
+    with mock.patch("restlogger.utils.time.time", return_value=2000000000):
+        assert cache.get_payload(token) == {"user_id": 1, "exp": 2000000000}
+    assert cache.stats() == {"size": 1, "hits": 0, "misses": 2}
+
+
+def test_get_jwt_token_payload():
+    token = jwt.encode({"user_id": 1}, "secret")
+    with override_settings(API_LOGGER_JWT_CACHE_SIZE=16):
+        assert get_jwt_token_payload(token) == {"user_id": 1}
+        assert get_jwt_token_payload(token) == {"user_id": 1}
+        assert get_jwt_payload_cache().stats() == {"size": 1, "hits": 1, "misses": 1}
+    with override_settings(API_LOGGER_JWT_CACHE_SIZE=0):
+        assert get_jwt_token_payload(token) == {"user_id": 1}
+        assert get_jwt_payload_cache().stats() == {"size": 0, "hits": 0, "misses": 0}
+
+
+def test_get_jwt_token_payload_with_given_cache_and_config():
+    token = jwt.encode({"user_id": 1}, "secret")
+    cache = JWTPayloadCache(max_size=4)
+    assert get_jwt_token_payload(token, Config(jwt_cache_size=4), cache) == {"user_id": 1}
+    assert cache.stats() == {"size": 1, "hits": 0, "misses": 1}
+    assert get_jwt_token_payload(token, Config(jwt_cache_size=0), cache) == {"user_id": 1}
+    assert cache.stats() == {"size": 1, "hits": 0, "misses": 1}
+
+
 def test_exclude_path():
     path1 = "/path1/"
     path2 = "/path2/"
@@ -100,3 +179,217 @@ def test_mask_sensitive_data_ok_if_int():
     masked_data = mask_sensitive_data(data)
 
     assert masked_data == 122
+
+
+@pytest.mark.parametrize(
+    "content_type, patterns, expected",
+    [
+        ("application/json", ("application/json",), True),
+        ("application/json; charset=utf-8", ("application/json",), True),
+        ("Application/JSON", ("application/json",), True),
+        ("application/problem+json", ("application/*+json",), True),
+        ("image/png", ("image/*",), True),
+        ("text/csv", ("*/*",), True),
+        ("application/jsonp", ("application/json",), False),
+        ("multipart/form-data; boundary=xyz", ("application/json", "application/*+json"), False),
+        ("", ("application/json",), False),
+    ],
+)
+def test_match_media_type(content_type, patterns, expected):
+    assert match_media_type(content_type, patterns) is expected
+
+
+def test_sensitive_key_matcher():
+    matcher = SensitiveKeyMatcher(("password", "api.key"))
+    assert matcher.is_sensitive("password")
+    assert matcher.is_sensitive("old_password")
+    assert matcher.is_sensitive("my_api.key")
+    assert not matcher.is_sensitive("my_api_key")
+    assert not matcher.is_sensitive("user")
+    assert not matcher.is_sensitive(42)
+    assert matcher.is_sensitive.cache_info().currsize == 6
+
+
+def test_sensitive_key_matcher_without_keys():
+    assert not SensitiveKeyMatcher(()).is_sensitive("password")
+
+
+@override_settings(API_LOGGER_SENSITIVE_KEYS=("token",))
+def test_mask_sensitive_data_follows_settings():
+    assert get_sensitive_key_matcher().is_sensitive("token")
+    assert mask_sensitive_data({"token": "value", "password": "value", "user": "value"}) == {
+        "token": "***FILTERED***",
+        "password": "***FILTERED***",
+        "user": "value",
+    }
+
+
+def test_mask_sensitive_data_in_dicts_nested_in_lists():
+    data = {"users": [{"name": "myuser", "password": "mypassword", "groups": [{"token": "x", "password": "y"}]}]}
+    masked_data = mask_sensitive_data(data)
+
+    assert masked_data == {
+        "users": [
+            {"name": "myuser", "password": "***FILTERED***", "groups": [{"token": "x", "password": "***FILTERED***"}]}
+        ]
+    }
+
+
+def test_mask_sensitive_data_and_apply_hash_filter_modify_data_in_place():
+    data = {"user": "myuser", "password": "mypassword", "path": {"to": {"hash": "some value"}}}
+    assert mask_sensitive_data(data) is data
+    assert mask_sensitive_data_dict(data) is data
+    assert apply_hash_filter(data) is data
+    assert data == {
+        "user": "myuser",
+        "password": "***FILTERED***",
+        "path": {"to": {"hash": "Hash 5946210c9e93ae37891dfe96c3e39614"}},
+    }
+
+
+def test_get_masked_copy():
+    shared = {"token": "x"}
+    circular: list = [shared]
+    circular.append(circular)
+    data = {"password": "secret", "items": [shared, shared], "circular": circular}
+    masked_data = get_masked_copy(data, SensitiveKeyMatcher(("password", "token")).is_sensitive)
+    assert masked_data["password"] == "***FILTERED***"
+    assert masked_data["items"] == [{"token": "***FILTERED***"}] * 2
+    assert masked_data["items"][0] is masked_data["items"][1] is masked_data["circular"][0]
+    assert masked_data["circular"][1] is masked_data["circular"]
+    assert data["password"] == "secret" and shared == {"token": "x"}
+
+
+def test_redact_only_matches_dict_keys():
+    matcher = SensitiveKeyMatcher(("password",))
+    redact({"items": [{"password": "x"} for _ in range(3000)]}, matcher=matcher)
+    assert matcher.is_sensitive.cache_info().currsize == 2
+
+
+def test_redact_does_not_modify_data():
+    data = {"user": "myuser", "password": "mypassword", "path": {"to": {"hash": "some value"}}}
+    redacted_data = redact(data, key_paths=(("path", "to", "hash"),))
+    assert redacted_data["password"] == "***FILTERED***"
+    assert data == {"user": "myuser", "password": "mypassword", "path": {"to": {"hash": "some value"}}}
+
+
+def test_redact_masks_and_hashes_in_a_single_pass():
+    data = {
+        "request": {"body": {"password": "mypassword", "items": [{"password": "x"}]}},
+        "response": {"data": {"content": "some value"}, "status_code": 200},
+    }
+    redacted_data = redact(data, key_paths=(("response", "data"), ("request", "missing", "key")))
+
+    assert redacted_data == {
+        "request": {"body": {"password": "***FILTERED***", "items": [{"password": "***FILTERED***"}]}},
+        "response": {"data": "Hash 2f9117ea21428d6831196cc6fc4f0afa", "status_code": 200},
+    }
+
+
+@override_settings(API_LOGGER_PAYLOAD_MAX_DEPTH=None)
+def test_redact_deep_payload_without_recursion():
+    data: dict = {"password": "mypassword"}
+    for _ in range(5000):
+        data = {"nested": data}
+    redacted_data = redact(data)
+
+    for _ in range(5000):
+        redacted_data = redacted_data["nested"]
+    assert redacted_data == {"password": "***FILTERED***"}
+
+
+def test_redact_max_depth():
+    data = {"level1": {"level2": {"password": "mypassword"}}, "list": [[{"password": "mypassword"}]]}
+
+    assert redact(data, max_depth=1) == {
+        "level1": {"level2": {"_truncated": True, "len": 1}},
+        "list": [{"_truncated": True, "len": 1}],
+    }
+
+
+def test_redact_max_items():
+    data = {"first": [1, 2, 3], "second": {"password": "mypassword"}}
+    redacted_data = redact(data, max_items=4)
+
+    assert len(redacted_data) == 2
+    assert MAX_ITEMS_EXCEEDED in redacted_data.values()
+    assert "mypassword" not in str(redacted_data)
+
+
+def test_redact_shapes_lists_and_strings():
+    data = {
+        "items": [{"id": index, "password": "mypassword"} for index in range(5000)],
+        "text": "a long text",
+        "short": "text",
+    }
+    redacted_data = redact(data, max_list_items=2, max_string_length=6)
+
+    assert redacted_data == {
+        "items": [
+            {"id": 0, "password": "***FILTERED***"},
+            {"id": 1, "password": "***FILTERED***"},
+            {"_truncated": True, "len": 5000},
+        ],
+        "text": "a long...[11 chars]",
+        "short": "text",
+    }
+    assert len(data["items"]) == 5000
+
+
+def test_redact_hashes_before_shaping():
+    data = {"response": {"data": list(range(10))}, "other": list(range(10))}
+    redacted_data = redact(data, key_paths=(("response", "data"),), max_list_items=2)
+
+    assert redacted_data["response"]["data"] == hash_object(list(range(10)))
+    assert redacted_data["other"] == [0, 1, {"_truncated": True, "len": 10}]
+
+
+@override_settings(API_LOGGER_PAYLOAD_MAX_LIST_ITEMS=1, API_LOGGER_PAYLOAD_MAX_STRING_LENGTH=2)
+def test_redact_shapes_without_masking_or_hashing():
+    assert redact({"list": [1, 2], "string": "abc"}, mask=False) == {
+        "list": [1, {"_truncated": True, "len": 2}],
+        "string": "ab...[3 chars]",
+    }
+
+
+@override_settings(API_LOGGER_HASH_MODE="streaming")
+def test_hash_object_streaming_mode_is_canonical():
+    hashed = hash_object({"b": [1, 2, {"y": 1, "x": 2}], "a": "value"})
+
+    assert hashed == hash_object({"a": "value", "b": [1, 2, {"x": 2, "y": 1}]})
+    assert hashed != hash_object({"a": "value", "b": [2, 1, {"x": 2, "y": 1}]})
+    assert hashed == "Hash " + hashlib.blake2b(b'{"a":"value","b":[1,2,{"x":2,"y":1}]}', digest_size=16).hexdigest()
+
+
+@override_settings(API_LOGGER_HASH_MODE="streaming", API_LOGGER_HASH_MAX_SIZE=8)
+def test_hash_object_streaming_mode_max_size():
+    hashed = hash_object([{"content": index} for index in range(1000)])
+
+    expected_digest = hashlib.blake2b(b'1000[{"conte', digest_size=16).hexdigest()
+    assert hashed == f"Hash {expected_digest} (prefix of 8 bytes, 1000 items)"
+
+
+@override_settings(API_LOGGER_HASH_MAX_SIZE=4)
+def test_hash_object_legacy_mode_max_size():
+    expected_digest = hashlib.md5(b"7" + b"cont").hexdigest()
+    assert hash_object("content") == f"Hash {expected_digest} (prefix of 4/7 bytes)"
+
+
+@override_settings(API_LOGGER_HASH_MODE="streaming")
+def test_hash_object_streaming_mode_with_keys_of_mixed_types():
+    hashed = hash_object({"by_id": {1: "a", "total": 2}, "by_pair": {(1, 2): "b"}})
+
+    assert hashed == hash_object({"by_pair": {"(1, 2)": "b"}, "by_id": {"total": 2, "1": "a"}})
+    circular: list = []
+    circular.append(circular)
+    assert hash_object(circular) == "Hash " + hashlib.blake2b(b"[[...]]", digest_size=16).hexdigest()
+
+
+def test_hash_bytes():
+    assert hash_bytes(b"content") == "Hash " + hashlib.blake2b(b"content", digest_size=16).hexdigest()
+
+
+@override_settings(API_LOGGER_HASH_MAX_SIZE=4)
+def test_hash_bytes_max_size():
+    expected_digest = hashlib.blake2b(b"7" + b"cont", digest_size=16).hexdigest()
+    assert hash_bytes(b"content") == f"Hash {expected_digest} (prefix of 4/7 bytes)"
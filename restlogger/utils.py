@@ -1,51 +1,325 @@
 import contextlib
+import functools
 import hashlib
-from typing import Union
+import itertools
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
 
 import jwt
-from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from jwt.exceptions import DecodeError
 
+from .conf import Config, get_config
+from .routing import get_path_router
+
+FILTERED = "***FILTERED***"
+MAX_ITEMS_EXCEEDED = "***MAX ITEMS EXCEEDED***"
+TRUNCATED_STRING_SUFFIX = "...[{length} chars]"
+
+SENSITIVE_KEY_CACHE_SIZE = 1024
+
 
 def apply_hash_filter(data: dict) -> dict:
     """
-    Iterates over the filter tuples from settings and call hashing function on them
+    Iterates over the key paths defined in settings and hash the values found, modifying data in place
+    (see redact to get a hashed copy instead)
     """
-    for key_path in settings.API_LOGGER_KEY_PATH_TO_HASH:
+    for key_path in get_config().hashed_key_paths:
         find_and_hash_key(data, key_path)
     return data
 
 
-def mask_sensitive_data(data: Union[dict, list]) -> Union[dict, list]:
+class SensitiveKeyMatcher:
     """
-    Recursive function to apply the mask function on different data types
+    Tells whether a key contains one of the given sensitive keys.
+    The sensitive keys are compiled into a single regex alternation, and the decision for each key is
+    memoized in a bounded LRU cache, as payloads keep reusing the same small vocabulary of keys
     """
-    if isinstance(data, dict):
-        return mask_sensitive_data_dict(data)
-    if isinstance(data, list):
-        for item in data:
-            mask_sensitive_data(item)
-        return data
-    return data
+
+    def __init__(self, sensitive_keys: Iterable[str], cache_size: int = SENSITIVE_KEY_CACHE_SIZE):
+        sensitive_keys = tuple(sensitive_keys)
+        self.pattern = re.compile("|".join(map(re.escape, sensitive_keys))) if sensitive_keys else None
+        self.is_sensitive = functools.lru_cache(maxsize=cache_size)(self._is_sensitive)
+
+    def _is_sensitive(self, key) -> bool:
+        return self.pattern is not None and isinstance(key, str) and self.pattern.search(key) is not None
+
+
+def get_sensitive_key_matcher() -> SensitiveKeyMatcher:
+    """
+    Return the matcher for the sensitive keys defined in settings, compiled by the configuration
+    """
+    return get_config().sensitive_key_matcher
 
 
-def mask_sensitive_data_dict(data: dict) -> dict:
+def mask_sensitive_data(data: Union[dict, list], matcher: Optional[SensitiveKeyMatcher] = None) -> Union[dict, list]:
     """
-    Iterates over data dict and mask any key that contains one of sensitive keys defined in settings
+    Mask any key that contains one of sensitive keys defined in settings, at any nesting level,
+    modifying data in place (see redact to get a masked copy instead)
     """
-    for key, value in data.items():
-        if any(sensitive_key in key for sensitive_key in settings.API_LOGGER_SENSITIVE_KEYS):
-            if isinstance(value, list):
-                data[key] = ["***FILTERED***" for item in data[key]]
-            else:
-                data[key] = "***FILTERED***"
+    is_sensitive = (matcher or get_sensitive_key_matcher()).is_sensitive
+    stack = [data]
+    while stack:
+        value = stack.pop()
         if isinstance(value, dict):
-            mask_sensitive_data(value)
+            for key, item in value.items():
+                if is_sensitive(key):
+                    value[key] = [FILTERED for _ in item] if isinstance(item, list) else FILTERED
+                elif isinstance(item, (dict, list)):
+                    stack.append(item)
+        elif isinstance(value, list):
+            stack.extend(item for item in value if isinstance(item, (dict, list)))
+    return data
+
+
+def mask_sensitive_data_dict(data: dict, matcher: Optional[SensitiveKeyMatcher] = None) -> dict:
+    """
+    Iterates over data dict and mask any key that contains one of sensitive keys defined in settings, in place
+    """
+    mask_sensitive_data(data, matcher)
     return data
 
 
-def hash_object(object) -> str:
-    return "Hash " + hashlib.md5(str(object).encode("utf-8")).hexdigest()
+def redact(
+    data,
+    key_paths: Iterable[tuple] = (),
+    mask: bool = True,
+    matcher: Optional[SensitiveKeyMatcher] = None,
+    max_depth: Optional[int] = None,
+    max_items: Optional[int] = None,
+    max_list_items: Optional[int] = None,
+    max_string_length: Optional[int] = None,
+    config: Optional[Config] = None,
+):
+    """
+    Return a redacted copy of data, walking it once with an explicit stack (no recursion):
+    values of sensitive keys are masked and values at the given key paths are hashed, in the same traversal.
+    Containers nested deeper than max_depth are replaced by a summary, containers exceeding the max_items budget
+    of values to walk by a placeholder, so that nothing is ever logged without being redacted.
+    The payload is also shaped, to bound the size of the record: only the first max_list_items items of lists
+    are kept, followed by a summary, and strings are cut to max_string_length characters.
+    The matcher, limits and hash mode default to the given config (the one compiled from settings if None):
+    API_LOGGER_SENSITIVE_KEYS, API_LOGGER_PAYLOAD_MAX_DEPTH / _MAX_ITEMS / _MAX_LIST_ITEMS / _MAX_STRING_LENGTH.
+    The input data is never modified
+    """
+    hash_paths = {tuple(key_path) for key_path in key_paths if key_path}
+    config = config or get_config()
+    if max_list_items is None:
+        max_list_items = config.payload_max_list_items
+    if max_string_length is None:
+        max_string_length = config.payload_max_string_length
+    shape = max_list_items is not None or max_string_length is not None
+    if not isinstance(data, (dict, list)) or not (mask or hash_paths or shape):
+        return data
+    if mask and matcher is None:
+        matcher = config.sensitive_key_matcher
+    is_sensitive = matcher.is_sensitive if mask and matcher is not None else None
+    hash_path_prefixes = {key_path[:index] for key_path in hash_paths for index in range(1, len(key_path))}
+    if max_depth is None:
+        max_depth = config.payload_max_depth
+    if max_items is None:
+        max_items = config.payload_max_items
+
+    root = [data]
+    # each entry is a container to copy, as (parent, slot in parent, key path if it leads to a hash path, depth)
+    stack: list[tuple] = [(root, 0, () if hash_paths else None, 0)]
+    walked_items = 0
+    while stack:
+        parent, slot, path, depth = stack.pop()
+        value = parent[slot]
+        if max_depth is not None and depth > max_depth:
+            parent[slot] = get_truncation_summary(value)
+            continue
+        kept_items = len(value)
+        if isinstance(value, list) and max_list_items is not None:
+            kept_items = min(kept_items, max_list_items)
+        walked_items += kept_items
+        if max_items is not None and walked_items > max_items:
+            parent[slot] = MAX_ITEMS_EXCEEDED
+            continue
+
+        # only dict keys can be sensitive: list indexes never reach the matcher and its cache
+        check_key = is_sensitive if isinstance(value, dict) else None
+        if isinstance(value, dict):
+            redacted: Union[dict, list] = {}
+            items: Iterable = value.items()
+        elif kept_items < len(value):
+            redacted = [*itertools.islice(value, kept_items), get_truncation_summary(value)]
+            items = enumerate(itertools.islice(value, kept_items))
+        else:
+            redacted = list(value)
+            items = enumerate(value)
+        parent[slot] = redacted
+        for key, item in items:
+            if check_key is not None and check_key(key):
+                redacted[key] = [FILTERED for _ in item] if isinstance(item, list) else FILTERED
+                continue
+            redacted[key] = item
+            item_path = None
+            if path is not None:
+                item_path = path + (key,)
+                if item_path in hash_paths:
+                    if item:
+                        # sensitive values are masked before hashing, so that they can't be recovered from the hash
+                        masked_item = get_masked_copy(item, is_sensitive) if is_sensitive is not None else item
+                        redacted[key] = hash_object(masked_item, config)
+                    continue
+                if item_path not in hash_path_prefixes:
+                    item_path = None
+            if isinstance(item, (dict, list)):
+                stack.append((redacted, key, item_path, depth + 1))
+            elif max_string_length is not None and isinstance(item, str) and len(item) > max_string_length:
+                redacted[key] = item[:max_string_length] + TRUNCATED_STRING_SUFFIX.format(length=len(item))
+    return root[0]
+
+
+def get_masked_copy(data, is_sensitive: Callable[[Any], bool]):
+    """
+    Return a copy of data where the values of sensitive keys are masked, at any nesting level.
+    Nothing else is changed: shared and circular references are copied as such
+    """
+    if not isinstance(data, (dict, list)):
+        return data
+    copies: dict[int, Union[dict, list]] = {}
+    root = [data]
+    stack: list[tuple] = [(root, 0)]
+    while stack:
+        parent, slot = stack.pop()
+        value = parent[slot]
+        if id(value) in copies:
+            parent[slot] = copies[id(value)]
+            continue
+        if isinstance(value, dict):
+            masked = {
+                key: ([FILTERED for _ in item] if isinstance(item, list) else FILTERED) if is_sensitive(key) else item
+                for key, item in value.items()
+            }
+            copy: Union[dict, list] = masked
+            items: Iterable = masked.items()
+        else:
+            copy = list(value)
+            items = enumerate(copy)
+        parent[slot] = copies[id(value)] = copy
+        stack.extend((copy, key) for key, item in items if isinstance(item, (dict, list)))
+    return root[0]
+
+
+def get_truncation_summary(value: Union[dict, list]) -> dict:
+    """
+    Compact summary of a container left out of the record
+    """
+    return {"_truncated": True, "len": len(value)}
+
+
+HASH_MODE_LEGACY = "legacy"
+HASH_MODE_STREAMING = "streaming"
+HASH_LIST_BATCH_SIZE = 256
+
+_canonical_json_encoder = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+
+
+def hash_object(object, config: Optional[Config] = None) -> str:
+    """
+    Hash any object. The legacy mode hashes the object repr with md5. The streaming mode feeds a canonical JSON
+    serialization chunk by chunk into blake2b, never building the whole serialization in memory: it is a memory
+    trade-off, not a speed-up, as sorting keys and serializing to JSON costs about as much as the repr (or more).
+    It also makes hashes independent of the key order. To cut the hashing cost, enable API_LOGGER_HASH_RESPONSE_CONTENT
+    instead, which hashes the rendered response bytes without serializing the data again.
+    Objects whose serialization is larger than API_LOGGER_HASH_MAX_SIZE bytes are hashed as their length plus
+    a prefix of that size. The legacy mode knows the length in bytes of the repr; the streaming mode stops
+    serializing at the cap, so it uses the number of items of the object instead (without length if it has none).
+    Objects that cannot be serialized canonically (e.g. circular references) are hashed through their repr.
+    The hash mode and size cap are read from the given config, or the one compiled from settings
+    """
+    config = config or get_config()
+    if config.hash_mode == HASH_MODE_LEGACY:
+        return _hash_content(str(object).encode("utf-8"), hashlib.md5(), config.hash_max_size)
+    try:
+        return _hash_canonical_json(object, config.hash_max_size)
+    except (TypeError, ValueError, RecursionError):
+        return _hash_content(str(object).encode("utf-8"), hashlib.blake2b(digest_size=16), config.hash_max_size)
+
+
+def _hash_content(content: bytes, hasher, max_size: Optional[int]) -> str:
+    """Hash content, or its length plus a prefix of max_size bytes if it is larger"""
+    if max_size is not None and len(content) > max_size:
+        hasher.update(str(len(content)).encode())
+        hasher.update(memoryview(content)[:max_size])
+        return f"Hash {hasher.hexdigest()} (prefix of {max_size}/{len(content)} bytes)"
+    hasher.update(content)
+    return "Hash " + hasher.hexdigest()
+
+
+def _hash_canonical_json(object, max_size: Optional[int]) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    if max_size is None:
+        for chunk in _iter_canonical_json(object):
+            hasher.update(chunk.encode("utf-8"))
+        return "Hash " + hasher.hexdigest()
+    prefix = bytearray()
+    for chunk in _iter_canonical_json(object):
+        prefix += chunk.encode("utf-8")
+        if len(prefix) > max_size:
+            break
+    else:
+        hasher.update(prefix)
+        return "Hash " + hasher.hexdigest()
+    try:
+        length = len(object)
+    except TypeError:
+        hasher.update(memoryview(prefix)[:max_size])
+        return f"Hash {hasher.hexdigest()} (prefix of {max_size} bytes)"
+    hasher.update(str(length).encode())
+    hasher.update(memoryview(prefix)[:max_size])
+    return f"Hash {hasher.hexdigest()} (prefix of {max_size} bytes, {length} items)"
+
+
+def hash_bytes(content: bytes, config: Optional[Config] = None) -> str:
+    """
+    Hash already serialized content (e.g. a rendered response) with blake2b.
+    Contents larger than API_LOGGER_HASH_MAX_SIZE bytes are hashed as their length plus a prefix of that size
+    """
+    return _hash_content(content, hashlib.blake2b(digest_size=16), (config or get_config()).hash_max_size)
+
+
+def _iter_canonical_json(object, depth: int = 2) -> Iterator[str]:
+    """
+    Serialize an object to JSON with sorted keys, yielding outer dicts key by key and lists in batches of items
+    (each batch is serialized by the C encoder), so that large list responses are never held as a single string
+    """
+    if depth and isinstance(object, dict):
+        yield "{"
+        for index, key in enumerate(sorted(object, key=str)):
+            yield f"{',' if index else ''}{_canonical_json_encoder.encode(str(key))}:"
+            yield from _iter_canonical_json(object[key], depth - 1)
+        yield "}"
+    elif isinstance(object, (list, tuple)) and len(object) > HASH_LIST_BATCH_SIZE:
+        yield "["
+        for start in range(0, len(object), HASH_LIST_BATCH_SIZE):
+            batch = _canonical_json_encoder.encode(list(object[start : start + HASH_LIST_BATCH_SIZE]))
+            yield f"{',' if start else ''}{batch[1:-1]}"
+        yield "]"
+    else:
+        try:
+            encoded = _canonical_json_encoder.encode(object)
+        except TypeError:
+            # keys that can't be sorted together (e.g. int and str) or encoded (e.g. tuples) are compared as str
+            encoded = _canonical_json_encoder.encode(_stringify_keys(object))
+        yield encoded
+
+
+def _stringify_keys(object):
+    """Return a copy of object where the keys of the dicts at any nesting level are converted to str"""
+    if isinstance(object, dict):
+        return {str(key): _stringify_keys(value) for key, value in object.items()}
+    if isinstance(object, (list, tuple)):
+        return [_stringify_keys(item) for item in object]
+    return object
 
 
 def find_and_hash_key(data: dict, key_path: tuple):
@@ -61,9 +335,10 @@ def find_and_hash_key(data: dict, key_path: tuple):
 
 def exclude_path(path: str) -> bool:
     """
-    Check if given path is in a list defined on Settings
+    Check if given path must not be logged, according to the path rules defined on Settings
     """
-    return any(path.startswith(excluded_path) for excluded_path in settings.API_LOGGER_URL_PATH_TO_EXCLUDE)
+    route = get_path_router().match(path)
+    return route is None or not route.enabled
 
 
 def decode_jwt_token_payload(token: str) -> dict:
@@ -75,3 +350,103 @@ def decode_jwt_token_payload(token: str) -> dict:
     except DecodeError:
         payload = {}
     return payload
+
+
+class JWTPayloadCache:
+    """
+    Bounded, thread safe LRU cache of decoded JWT payloads, as clients reuse the same token for many requests.
+    Entries are keyed by a digest of the raw token, so tokens are not kept in memory, and they are evicted
+    once the token expires according to its "exp" claim
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[dict, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_payload(self, token: str) -> dict:
+        """Return a copy of the payload of the given token, decoding it only if it is not cached"""
+        key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None:
+                payload, expires_at = entry
+                if expires_at is None or time.time() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(payload)
+                del self._entries[key]
+            self.misses += 1
+        payload = decode_jwt_token_payload(token)
+        expires_at = payload.get("exp")
+        with self._lock:
+            self._entries[key] = (payload, expires_at if isinstance(expires_at, (int, float)) else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return dict(payload)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return counters about the cache usage"""
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_jwt_payload_cache: Optional[JWTPayloadCache] = None
+_jwt_payload_cache_lock = threading.Lock()
+
+
+def get_jwt_payload_cache() -> JWTPayloadCache:
+    """
+    Return the process wide JWTPayloadCache, creating it from settings on first use
+    """
+    global _jwt_payload_cache
+    if _jwt_payload_cache is None:
+        with _jwt_payload_cache_lock:
+            if _jwt_payload_cache is None:
+                _jwt_payload_cache = JWTPayloadCache(max_size=get_config().jwt_cache_size)
+    return _jwt_payload_cache
+
+
+@receiver(setting_changed)
+def reset_jwt_payload_cache(setting, **kwargs):
+    global _jwt_payload_cache
+    if setting == "API_LOGGER_JWT_CACHE_SIZE":
+        _jwt_payload_cache = None
+
+
+def get_jwt_token_payload(
+    token: str, config: Optional[Config] = None, cache: Optional[JWTPayloadCache] = None
+) -> dict:
+    """
+    Extracts payload from a JWT token, through the given JWT payload cache (the process wide one if None),
+    unless the cache is disabled by the given config (the one compiled from settings if None)
+    """
+    if not (config or get_config()).jwt_cache_size:
+        return decode_jwt_token_payload(token)
+    return (cache or get_jwt_payload_cache()).get_payload(token)
+
+
+def match_media_type(content_type: str, patterns: Iterable[str]) -> bool:
+    """
+    Check if a content type (parameters are ignored) matches one of the given media type patterns.
+    Patterns can be exact media types, or use wildcards like "image/*", "application/*+json" or "*/*"
+    """
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    main_type, _, sub_type = media_type.partition("/")
+    for pattern in patterns:
+        if pattern == media_type or pattern == "*/*":
+            return True
+        pattern_main_type, _, pattern_sub_type = pattern.partition("/")
+        if pattern_main_type != main_type:
+            continue
+        if pattern_sub_type == "*":
+            return True
+        if pattern_sub_type.startswith("*+") and sub_type.endswith(pattern_sub_type[1:]):
+            return True
+    return False